@@ -0,0 +1,233 @@
+"""Benchmarks of dcli on synthetic command trees.
+
+Each tree has |breadth| sub-commands under the root, one of which is a chain of |depth| nested sub-commands, and every
+command has |options| options. The invoked command line walks the whole chain and passes every option of the deepest
+command.
+
+Timings are taken around the public calls only, so that the same script measures older versions of dcli, e.g. from
+a worktree of an older commit given by DCLI_BENCH_SRC; metrics the older version can not report are left out.
+
+Usage:
+$ git worktree add /tmp/dcli-base <commit>
+$ DCLI_BENCH_SRC=/tmp/dcli-base/src python3 benchmarks/bench.py run --lazy 0 -o base.json
+$ python3 benchmarks/bench.py run --breadth 10 1000 --depth 1 8 -o head.json
+$ python3 benchmarks/bench.py compare base.json head.json
+"""
+
+import contextlib
+import inspect
+import io
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+SRC_ROOT = pathlib.Path(os.environ.get("DCLI_BENCH_SRC") or
+                        pathlib.Path(__file__).parent.parent.joinpath("src")).resolve()
+sys.path.insert(0, str(SRC_ROOT))
+import dcli  # noqa: E402
+
+# metrics where a lower value is better.
+METRICS = ["build_seconds", "peak_memory_bytes", "tree_memory_bytes", "cold_seconds",
+           "cold_process_seconds", "parse_seconds", "call_seconds", "help_seconds"]
+
+
+def treeSource(breadth: int, depth: int, options: int, lazy: bool) -> str:
+    def opts():
+        return "".join(f'    dcli.arg("--opt{i}", dest="opt{i}", type=int, default=0),\n'
+                       for i in range(options))
+
+    # versions of dcli before the lazy mode have no lazy argument.
+    lazy_arg = "    lazy=True,\n" if lazy else ""
+    lines = ["import dcli\n\n",
+             f'@dcli.command(\n    "root",\n{opts()}{lazy_arg}    skippable=False\n)\n',
+             "def root(ns):\n    pass\n\n"]
+    for i in range(breadth):
+        lines.append(f'@dcli.command(\n    "sub{i}",\n{opts()}    parent=root,\n    help="sub command #{i}.",\n'
+                     f"    need_sub={i == 0 and depth > 1},\n    skippable=False\n)\n"
+                     f"def sub{i}(ns):\n    pass\n\n")
+    parent = "sub0"
+    for level in range(1, depth):
+        lines.append(f'@dcli.command(\n    "level{level}",\n{opts()}    parent={parent},\n'
+                     f"    need_sub={level < depth - 1},\n    skippable=False\n)\n"
+                     f"def level{level}(ns):\n    pass\n\n")
+        parent = f"level{level}"
+    return "".join(lines)
+
+
+def treeArgv(depth: int, options: int) -> list:
+    argv = ["sub0"] + [f"level{x}" for x in range(1, depth)]
+    for i in range(options):
+        argv += [f"--opt{i}", str(i)]
+    return argv
+
+
+def buildTree(code):
+    module = types.ModuleType("bench_tree")
+    exec(code, module.__dict__)
+    return module.root
+
+
+def measureCold(source: str, argv: list) -> tuple:
+    with tempfile.TemporaryDirectory() as dir:
+        pathlib.Path(dir, "bench_tree.py").write_text(source)
+        script = ("import time\n"
+                  "begin = time.perf_counter()\n"
+                  "import bench_tree\n"
+                  f"bench_tree.root({argv!r})\n"
+                  "print(time.perf_counter() - begin)\n")
+        env = dict(os.environ,
+                   PYTHONPATH=os.pathsep.join([dir, str(SRC_ROOT)]),
+                   PYTHONDONTWRITEBYTECODE="1")
+        begin = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", script], env=env,
+                                check=True, capture_output=True, text=True).stdout
+        return float(output), time.perf_counter() - begin
+
+
+def measure(breadth: int, depth: int, options: int, lazy: bool, repeat: int) -> dict:
+    source = treeSource(breadth, depth, options, lazy)
+    argv = treeArgv(depth, options)
+
+    code = compile(source, "bench_tree.py", "exec")
+
+    tracemalloc.start()
+    buildTree(code)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    begin = time.perf_counter()
+    root = buildTree(code)
+    build_seconds = time.perf_counter() - begin
+
+    cold_seconds, cold_process_seconds = measureCold(source, argv)
+
+    root(argv)
+    parser = root._getParser()
+    parse_seconds = call_seconds = 0.0
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        parser.parse_args(argv)
+        parse_seconds += time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        root(argv)
+        call_seconds += time.perf_counter() - begin
+
+    help_seconds = 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(max(1, repeat // 10)):
+            begin = time.perf_counter()
+            try:
+                root(["-h"])
+            except SystemExit:
+                pass
+            help_seconds += time.perf_counter() - begin
+
+    result = {
+        "breadth": breadth,
+        "depth": depth,
+        "options": options,
+        "lazy": lazy,
+        "build_seconds": build_seconds,
+        "peak_memory_bytes": peak_memory,
+        "cold_seconds": cold_seconds,
+        "cold_process_seconds": cold_process_seconds,
+        "parse_seconds": parse_seconds / repeat,
+        "parse_per_second": repeat / parse_seconds,
+        "call_seconds": call_seconds / repeat,
+        "help_seconds": help_seconds / max(1, repeat // 10),
+    }
+    if hasattr(root, "memoryUsage"):
+        result["tree_memory_bytes"] = root.memoryUsage()["bytes"]
+    return result
+
+
+def gitCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=SRC_ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(result: dict) -> tuple:
+    return (result["breadth"], result["depth"], result["options"], result["lazy"])
+
+
+@dcli.command("bench", description="Benchmarks of dcli on synthetic command trees.")
+def Bench(ns):
+    pass
+
+
+@dcli.command(
+    "run",
+    dcli.arg("--breadth", nargs="+", type=int, default=[10, 100, 1000],
+             help="numbers of sub-commands under the root"),
+    dcli.arg("--depth", nargs="+", type=int, default=[1, 4, 8],
+             help="depths of the invoked command"),
+    dcli.arg("--options", nargs="+", type=int, default=[5],
+             help="numbers of options of each command"),
+    dcli.arg("--lazy", nargs="+", type=int, choices=[0, 1], default=[0, 1],
+             help="whether to build sub-commands lazily"),
+    dcli.arg("--repeat", type=int, default=200,
+             help="number of invocations for steady-state timings"),
+    dcli.arg("-o", "--output", dest="output",
+             help="file to write the results into (default: stdout)"),
+    parent=Bench,
+    help="run benchmarks and write the results as JSON."
+)
+def Run(ns):
+    lazies = ns.lazy
+    if "lazy" not in inspect.signature(dcli.command).parameters:
+        print(f"dcli {dcli.__version__} has no lazy mode, measuring eager trees only.", file=sys.stderr)
+        lazies = [x for x in lazies if not x]
+
+    results = []
+    for breadth in ns.breadth:
+        for depth in ns.depth:
+            for options in ns.options:
+                for lazy in lazies:
+                    result = measure(breadth, depth, options, bool(lazy), ns.repeat)
+                    print(json.dumps(result), file=sys.stderr)
+                    results.append(result)
+
+    report = json.dumps({"commit": gitCommit(),
+                         "dcli": dcli.__version__,
+                         "python": platform.python_version(),
+                         "results": results}, indent=2)
+    if ns.output:
+        pathlib.Path(ns.output).write_text(report + "\n")
+    else:
+        print(report)
+
+
+@dcli.command(
+    "compare",
+    dcli.arg("base", help="results of the baseline"),
+    dcli.arg("head", help="results to compare with the baseline"),
+    parent=Bench,
+    help="compare two results, a ratio above 1 is a regression."
+)
+def Compare(ns):
+    base = {_key(x): x for x in json.loads(pathlib.Path(ns.base).read_text())["results"]}
+    head = {_key(x): x for x in json.loads(pathlib.Path(ns.head).read_text())["results"]}
+
+    print(f"{'breadth':>8} {'depth':>6} {'options':>8} {'lazy':>5} " +
+          " ".join(f"{x.rsplit('_', 1)[0]:>20}" for x in METRICS))
+    for key in sorted(base.keys() & head.keys()):
+        # metrics missing from older results are compared as nan.
+        ratios = [head[key].get(x, 0) / base[key][x] if base[key].get(x) else float("nan")
+                  for x in METRICS]
+        print(f"{key[0]:>8} {key[1]:>6} {key[2]:>8} {str(key[3]):>5} " +
+              " ".join(f"{x:>20.2f}" for x in ratios))
+
+
+if __name__ == "__main__":
+    Bench()
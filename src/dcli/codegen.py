@@ -0,0 +1,488 @@
+"""Ahead-of-time code generation of dispatchers for dcli commands.
+
+A generated dispatcher is a standalone module holding the tables of options, positionals and sub-commands of a
+command tree, which parses command lines without building the tree nor importing dcli or argparse. Only the module of
+the invoked command is imported to run a parsed command line, and anything the tables do not handle (help,
+abbreviations, "--", invalid command lines, ...) falls back to the command tree and argparse. Regenerate the module whenever the commands
+change, and check it with "verify".
+
+Usage:
+$ python3 -m dcli.codegen build my_tool.commands:MyCommand my_tool/dispatch.py
+$ python3 -m dcli.codegen verify my_tool.commands:MyCommand my_tool/dispatch.py [CORPUS]
+$ python3 -m my_tool.dispatch sub1 --foo
+"""
+
+import ast as _ast
+import sys as _sys
+
+# public symbols
+__all__ = ["generate", "writeModule", "loadModule", "sampleCorpus", "verify"]
+
+_SUPPRESS = "==SUPPRESS=="
+
+_HEADER = '''"""Dispatcher of {target}, generated by dcli.codegen {version}. Do not edit."""
+
+import sys
+
+TARGET = {target!r}
+PIPELINE = {pipeline!r}
+BATCH = {batch!r}
+SUPPRESS = {suppress!r}
+
+# nodes: (prefix chars, {{option string: action}}, actions, positional actions, {{sub-command: node}} or None,
+#         whether a sub-command is required, parser defaults, reference of the command or None if it runs only
+#         from TARGET), or None for a node left to argparse.
+# actions: (kind, dest, nargs, const, default, type, choices, required)
+NODES = {nodes}
+'''
+
+_RUNTIME = '''
+_BUILTINS = {"int": int, "float": float, "str": str}
+_TYPES = {}
+
+
+class _Fallback(Exception):
+    pass
+
+
+def _import(reference):
+    from importlib import import_module
+
+    module, _, qualname = reference.partition(":")
+    obj = import_module(module)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _convert(action, token):
+    type = action[5]
+    if type is None:
+        return token
+    if type not in _TYPES:
+        _TYPES[type] = _BUILTINS[type] if type in _BUILTINS else _import(type)
+    try:
+        return _TYPES[type](token)
+    except Exception:
+        # argparse reports the error.
+        raise _Fallback()
+
+
+def _value(action, token):
+    value = _convert(action, token)
+    if action[6] is not None and value not in action[6]:
+        raise _Fallback()
+    return value
+
+
+def _apply(action, value, namespace):
+    kind, dest, _, const = action[:4]
+    if kind == "store":
+        namespace[dest] = value
+    elif kind == "const":
+        namespace[dest] = const
+    elif kind == "count":
+        count = namespace.get(dest)
+        namespace[dest] = (0 if count is None else count) + 1
+    else:
+        items = namespace.get(dest)
+        items = [] if items is None else list(items)
+        items.append(value if kind == "append" else const)
+        namespace[dest] = items
+
+
+def _consume(action, argv, index, explicit, prefix, namespace):
+    nargs = action[2]
+    if action[0] == "fallback" or (explicit is not None and nargs not in (None, "?")):
+        raise _Fallback()
+    if nargs == 0:
+        _apply(action, None, namespace)
+        return index
+    if explicit is not None:
+        _apply(action, _value(action, explicit), namespace)
+        return index
+
+    limit = 1 if nargs in (None, "?") else nargs if isinstance(nargs, int) else len(argv)
+    tokens = []
+    while index < len(argv) and len(tokens) < limit and not (len(argv[index]) > 1 and argv[index][0] in prefix):
+        tokens.append(argv[index])
+        index += 1
+
+    if nargs is None:
+        if not tokens:
+            raise _Fallback()
+        value = _value(action, tokens[0])
+    elif nargs == "?":
+        if tokens:
+            value = _value(action, tokens[0])
+        else:
+            value = action[3]
+            if isinstance(value, str):
+                value = _value(action, value)
+            elif action[6] is not None and value not in action[6]:
+                raise _Fallback()
+    else:
+        if (isinstance(nargs, int) and len(tokens) != nargs) or (nargs == "+" and not tokens):
+            raise _Fallback()
+        value = [_value(action, x) for x in tokens]
+    _apply(action, value, namespace)
+    return index
+
+
+def _parse(node, argv, index, chain):
+    if NODES[node] is None:
+        raise _Fallback()
+    prefix, options, actions, positionals, subcommands, required_sub, defaults = NODES[node][:7]
+
+    namespace = {}
+    for action in actions:
+        if action[1] != SUPPRESS and action[4] != SUPPRESS and action[1] not in namespace:
+            namespace[action[1]] = action[4]
+    for dest, value in defaults.items():
+        namespace.setdefault(dest, value)
+
+    seen = set()
+    position = 0
+    entered = False
+    while index < len(argv):
+        token = argv[index]
+        if len(token) > 1 and token[0] in prefix:
+            explicit = None
+            if token not in options:
+                token, eq, explicit = token.partition("=")
+                if not eq or token not in options:
+                    raise _Fallback()
+            seen.add(options[token])
+            index = _consume(actions[options[token]], argv, index + 1, explicit, prefix, namespace)
+        elif position < len(positionals):
+            seen.add(positionals[position])
+            action = actions[positionals[position]]
+            _apply(action, _value(action, token), namespace)
+            position += 1
+            index += 1
+        elif subcommands is not None and token in subcommands:
+            chain.append(token)
+            # sub-commands parse into a new namespace, like argparse.
+            namespace.update(_parse(subcommands[token], argv, index + 1, chain))
+            entered = True
+            break
+        else:
+            raise _Fallback()
+
+    if position < len(positionals) or (subcommands is not None and required_sub and not entered):
+        raise _Fallback()
+    for i, action in enumerate(actions):
+        if i in seen:
+            continue
+        if action[7]:
+            raise _Fallback()
+        if isinstance(action[4], str) and action[4] != SUPPRESS and namespace.get(action[1]) is action[4]:
+            namespace[action[1]] = _convert(action, action[4])
+    return namespace
+
+
+def parse(argv):
+    """Return the (dests, sub-command names) of command line |argv|, or None if it is left to argparse."""
+
+    if (PIPELINE is not None and PIPELINE in argv) or (len(argv) == 2 and argv[0] == BATCH):
+        return None
+    chain = []
+    try:
+        return _parse(0, argv, 0, chain), chain
+    except _Fallback:
+        return None
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parsed = parse(argv)
+    if parsed is None:
+        return _import(TARGET)(argv)
+
+    values, chain = parsed
+    node = NODES[0]
+    for name in chain:
+        node = NODES[node[4][name]]
+    # the invoked command is imported by itself, and runs with its parents as in the command tree.
+    if node[7] is not None:
+        return _import(node[7])._callParsed(argv, values, [])
+    return _import(TARGET)._callParsed(argv, values, chain)
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _literal(value):
+    try:
+        if _ast.literal_eval(repr(value)) == value:
+            return value
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        pass
+    raise _Unsupported()
+
+
+def _typeName(type) -> str:
+    from .dcli import _importReference
+
+    if type == None:
+        return None
+    if type in (int, float, str):
+        return type.__name__
+
+    reference = f"{getattr(type, '__module__', None)}:{getattr(type, '__qualname__', '')}"
+    try:
+        if "<" not in reference and _importReference(reference) is type:
+            return reference
+    except (ImportError, AttributeError, ValueError):
+        pass
+    raise _Unsupported()
+
+
+def _action(action) -> tuple:
+    import argparse
+
+    kinds = {argparse._StoreAction: "store",
+             argparse._StoreConstAction: "const",
+             argparse._StoreTrueAction: "const",
+             argparse._StoreFalseAction: "const",
+             argparse._AppendAction: "append",
+             argparse._AppendConstAction: "append_const",
+             argparse._CountAction: "count"}
+
+    kind = kinds.get(type(action))
+    if kind == None:
+        # other actions, e.g. help and version, are left to argparse once they show up in a command line.
+        if action.dest != _SUPPRESS and action.default != _SUPPRESS:
+            raise _Unsupported()
+        return ("fallback", _SUPPRESS, None, None, _SUPPRESS, None, None, False)
+
+    nargs = action.nargs
+    if not (nargs in (None, 0, "?", "*", "+") or (isinstance(nargs, int) and nargs > 0)):
+        raise _Unsupported()
+    if not action.option_strings and nargs != None:
+        raise _Unsupported()
+
+    choices = action.choices
+    if choices != None:
+        choices = _literal(list(choices) if not isinstance(choices, (list, tuple, set, frozenset)) else choices)
+    return (kind, action.dest, nargs, _literal(action.const), _literal(action.default), _typeName(action.type),
+            choices, bool(action.required) and bool(action.option_strings))
+
+
+def _handler(cmd, path: tuple) -> str:
+    from .dcli import _CommandWrapper, _reference, _importReference
+
+    try:
+        reference = _reference(cmd._fn)
+        if _importReference(reference) is not cmd:
+            return None
+    except (ImportError, AttributeError, ValueError):
+        return None
+
+    # a command mounted elsewhere runs with other parents than in its own tree.
+    names = []
+    while isinstance(cmd, _CommandWrapper):
+        names.insert(0, cmd._name)
+        cmd = cmd._parent_cmd
+    return reference if tuple(names) == path else None
+
+
+def _node(cmd, nodes: list, path: tuple) -> int:
+    from .dcli import _SubCommandsAction
+
+    index = len(nodes)
+    nodes.append(None)
+    parser = cmd._getParser()
+
+    subcommands = {}
+    try:
+        if parser.fromfile_prefix_chars != None or parser._mutually_exclusive_groups:
+            raise _Unsupported()
+
+        options = {}
+        actions = []
+        positionals = []
+        subparsers = None
+        for action in parser._actions:
+            if isinstance(action, _SubCommandsAction):
+                subparsers = action
+                continue
+            if subparsers != None and not action.option_strings:
+                # positionals after sub-commands are left to argparse.
+                raise _Unsupported()
+            for option in action.option_strings:
+                options[option] = len(actions)
+            if not action.option_strings:
+                positionals.append(len(actions))
+            actions.append(_action(action))
+
+        node = (parser.prefix_chars, options, actions, positionals, subcommands if subparsers != None else None,
+                bool(subparsers != None and subparsers.required), _literal(dict(parser._defaults)),
+                _handler(cmd, path))
+    except _Unsupported:
+        node = None
+
+    # sub-commands of a node left to argparse are still generated, since argparse may not be needed below.
+    for name, sub in cmd._subcommands.items():
+        subcommands[name] = _node(sub, nodes, (*path, name))
+    nodes[index] = node
+    return index
+
+
+def generate(cmd, target: str) -> str:
+    """Return the source of the dispatcher module of root command |cmd|, importable as |target|, i.e. "module:name".
+    """
+
+    from .dcli import VERSION, _BATCH_SPECIFIER
+    import pprint
+
+    assert isinstance(target, str) and ":" in target, \
+        f"invalid target for command: {target}"
+    assert cmd._parent_cmd == None, \
+        f"generate a dispatcher of non-root command |{cmd}|."
+
+    nodes = []
+    _node(cmd, nodes, (cmd._name,))
+    return _HEADER.format(target=target,
+                          version=VERSION,
+                          pipeline=cmd._pipeline,
+                          batch=_BATCH_SPECIFIER,
+                          suppress=_SUPPRESS,
+                          nodes=pprint.pformat(nodes, width=120, sort_dicts=False)) + _RUNTIME
+
+
+def writeModule(target: str, path) -> None:
+    """Generate the dispatcher module of the root command |target|, i.e. "module:name", into |path|."""
+
+    from .dcli import _importReference
+
+    source = generate(_importReference(target), target)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+
+
+def loadModule(path):
+    """Load the generated dispatcher module from |path|."""
+
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location("_dcli_dispatcher", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def sampleCorpus(cmd) -> list:
+    """Return command lines walking every command of |cmd|, with sample values of each option and positional."""
+
+    def sample(action) -> list:
+        if action.choices:
+            return [str(next(iter(action.choices)))]
+        count = action.nargs if isinstance(action.nargs, int) else 0 if action.nargs == "?" else 1
+        return ["1"] * count
+
+    def positionals(node) -> list:
+        return [y for x in node._getParser()._actions if not x.option_strings and x.dest != _SUPPRESS
+                for y in sample(x)]
+
+    def completion(node) -> list:
+        # the shortest valid rest of a command line of |node|, through its first sub-commands if they are required.
+        if not node._required_sub or not node._subcommands:
+            return []
+        name, sub = next(iter(node._subcommands.items()))
+        return [name, *positionals(sub), *completion(sub)]
+
+    corpus = []
+    stack = [([], cmd)]
+    while stack:
+        path, node = stack.pop()
+        base = [*path, *positionals(node)]
+        rest = completion(node)
+        corpus.append([*base, *rest])
+        for action in node._getParser()._actions:
+            if action.dest == _SUPPRESS:
+                continue
+            for option in action.option_strings:
+                corpus.append([*base, option, *(sample(action) if action.nargs != 0 else []), *rest])
+        for name, sub in node._subcommands.items():
+            stack.append(([*base, name], sub))
+    return corpus
+
+
+def _expected(cmd, argv: list):
+    import contextlib
+    import io
+    from .dcli import Invocation, _INVOCATION
+
+    invocation = Invocation()
+    invocation._chain = []
+    token = _INVOCATION.set(invocation)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            args = cmd._getParser().parse_args(argv)
+    except (SystemExit, Exception):
+        return None
+    finally:
+        _INVOCATION.reset(token)
+    return vars(args), invocation._chain
+
+
+def verify(cmd, module, argvs) -> dict:
+    """Check the generated dispatcher |module| of root command |cmd| against argparse on command lines |argvs|.
+
+    The result holds the number of command lines in "checked", of those parsed the same as argparse in "matched", of
+    those left to argparse in "fallbacks", and the command lines parsed differently in "mismatches".
+    """
+
+    import contextvars
+
+    report = {"checked": 0, "matched": 0, "fallbacks": 0, "mismatches": []}
+    for argv in argvs:
+        argv = list(argv)
+        report["checked"] += 1
+        actual = module.parse(argv)
+        if actual == None:
+            report["fallbacks"] += 1
+        elif actual == contextvars.Context().run(_expected, cmd, argv):
+            report["matched"] += 1
+        else:
+            report["mismatches"].append(argv)
+    return report
+
+
+def main(argv: list) -> int:
+    if argv[:1] == ["build"] and len(argv) == 3:
+        writeModule(argv[1], argv[2])
+        return 0
+
+    if argv[:1] == ["verify"] and len(argv) in (3, 4):
+        import shlex
+        from .dcli import _importReference
+
+        cmd = _importReference(argv[1])
+        if len(argv) == 4:
+            with open(argv[3], "r", encoding="utf-8") as f:
+                corpus = [shlex.split(x) for x in f if x.strip() and not x.lstrip().startswith("#")]
+        else:
+            corpus = sampleCorpus(cmd)
+        report = verify(cmd, loadModule(argv[2]), corpus)
+        for mismatch in report["mismatches"]:
+            print(f"mismatch: {shlex.join(mismatch)}", file=_sys.stderr)
+        print(f"{report['checked']} checked, {report['matched']} matched, {report['fallbacks']} left to argparse, "
+              f"{len(report['mismatches'])} mismatched")
+        return 1 if report["mismatches"] else 0
+
+    print("usage: python3 -m dcli.codegen build TARGET OUTPUT\n"
+          "       python3 -m dcli.codegen verify TARGET OUTPUT [CORPUS]",
+          file=_sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    _sys.exit(main(_sys.argv[1:]))
@@ -0,0 +1,175 @@
+"""Shell completion for dcli commands.
+
+The completion of a command tree is answered from a prebuilt index, so that no _CommandWrapper or ArgumentParser is
+constructed, nor even imported, while the shell waits for candidates.
+
+Usage:
+$ python3 -m dcli.completion build my_tool.commands:MyCommand ~/.cache/my-tool.json
+$ python3 -m dcli.completion script bash my-tool ~/.cache/my-tool.json >> ~/.bashrc
+"""
+
+import json as _json
+import sys as _sys
+
+# public symbols
+__all__ = ["buildIndex", "writeIndex", "complete", "script"]
+
+
+def _nargs(action):
+    if action.nargs == None:
+        return 1
+    return action.nargs
+
+
+def buildIndex(cmd) -> dict:
+    """Build the completion index of command |cmd| and all its sub-commands.
+
+    Each node of the index holds the names of sub-commands in "sub", the option strings with their nargs and choices
+    in "opts" and the nargs and choices of positional arguments in "pos".
+    """
+
+    from .dcli import _SubCommandsAction
+
+    node = {"sub": {}, "opts": {}, "pos": []}
+    for action in cmd._getParser()._actions:
+        if isinstance(action, _SubCommandsAction):
+            continue
+        choices = [str(x) for x in action.choices] if action.choices else None
+        if action.option_strings:
+            for option in action.option_strings:
+                node["opts"][option] = [_nargs(action), choices]
+        else:
+            node["pos"].append([_nargs(action), choices])
+
+    for name, sub in cmd._subcommands.items():
+        node["sub"][name] = buildIndex(sub)
+
+    return node
+
+
+def writeIndex(cmd, path) -> None:
+    """Build the completion index of command |cmd| and write it into |path|."""
+
+    with open(path, "w", encoding="utf-8") as f:
+        _json.dump(buildIndex(cmd), f, separators=(",", ":"))
+
+
+def _positionalChoices(node: dict, position: int) -> list:
+    # the positional taking the word at |position|, where "*", "+" and "..." take all the words left.
+    for nargs, choices in node["pos"]:
+        if not isinstance(nargs, int) and nargs != "?":
+            return choices
+        count = 1 if nargs == "?" else nargs
+        if position < count:
+            return choices
+        position -= count
+    return None
+
+
+def complete(index: dict, words: list) -> list:
+    """Return the candidates for the last word of |words|, which are the command line words after the program name."""
+
+    node = index
+    position = 0
+    pending = 0
+    choices = None
+
+    for word in words[:-1]:
+        if pending:
+            pending -= 1
+            continue
+
+        if len(word) > 1 and word.startswith("-"):
+            name, eq, _ = word.partition("=")
+            nargs, choices = node["opts"].get(name, (0, None))
+            if not eq:
+                pending = nargs if isinstance(nargs, int) else 1
+        elif word in node["sub"]:
+            node = node["sub"][word]
+            position = 0
+        else:
+            position += 1
+
+    current = words[-1] if words else ""
+    if pending:
+        candidates = choices or []
+    elif current.startswith("-"):
+        candidates = node["opts"]
+    else:
+        candidates = list(node["sub"])
+        candidates.extend(_positionalChoices(node, position) or [])
+
+    return sorted(x for x in candidates if x.startswith(current))
+
+
+_SCRIPTS = {
+    "bash": """_dcli_complete_{func}() {{
+    local IFS=$'\\n'
+    COMPREPLY=($({python} -S {module} complete {index} "${{COMP_WORDS[@]:1:COMP_CWORD}}"))
+}}
+complete -o default -F _dcli_complete_{func} {prog}
+""",
+    "zsh": """_dcli_complete_{func}() {{
+    local -a candidates
+    candidates=("${{(@f)$({python} -S {module} complete {index} "${{(@)words[2,CURRENT]}}")}}")
+    compadd -a candidates
+}}
+compdef _dcli_complete_{func} {prog}
+""",
+    "fish": """complete -c {prog} -a {command}
+""",
+}
+_FISH_COMMAND = "({python} -S {module} complete {index} (commandline -opc)[2..-1] (commandline -ct))"
+
+
+def _fishQuote(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def script(shell: str, prog: str, index: str) -> str:
+    """Return the completion script of |shell| for program |prog| with the index file |index|."""
+
+    assert shell in _SCRIPTS, \
+        f"unsupported shell |{shell}|, choose from {', '.join(_SCRIPTS)}."
+
+    import shlex
+
+    # paths and names are quoted, since they may hold spaces or quotes.
+    quote = _fishQuote if shell == "fish" else shlex.quote
+    words = {"prog": quote(prog),
+             "index": quote(str(index)),
+             "python": quote(_sys.executable),
+             # this file is run as a plain script, which imports neither the dcli package nor argparse.
+             "module": quote(__file__)}
+    func = "".join(x if x.isalnum() else "_" for x in prog)
+    # the command of fish is a single-quoted string itself.
+    command = _fishQuote(_FISH_COMMAND.format(**words)) if shell == "fish" else None
+    return _SCRIPTS[shell].format(func=func, command=command, **words)
+
+
+def main(argv: list) -> int:
+    if argv[:1] == ["complete"] and len(argv) >= 2:
+        with open(argv[1], "r", encoding="utf-8") as f:
+            index = _json.load(f)
+        for candidate in complete(index, argv[2:] or [""]):
+            print(candidate)
+        return 0
+
+    if argv[:1] == ["build"] and len(argv) == 3:
+        from .dcli import _importReference
+        writeIndex(_importReference(argv[1]), argv[2])
+        return 0
+
+    if argv[:1] == ["script"] and len(argv) == 4:
+        print(script(*argv[1:]), end="")
+        return 0
+
+    print("usage: python3 -m dcli.completion complete INDEX [WORD ...]\n"
+          "       python3 -m dcli.completion build TARGET INDEX\n"
+          "       python3 -m dcli.completion script {bash,zsh,fish} PROG INDEX",
+          file=_sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    _sys.exit(main(_sys.argv[1:]))
@@ -0,0 +1,274 @@
+"""Warm daemon for dcli commands.
+
+A daemon hosts a command in a long-lived process on a Unix domain socket, and a thin client forwards its argv, working
+directory, environment and stdin to the daemon, then writes back the stdout, stderr and exit code of the command.
+Requests are served one after another, since the working directory, environment and standard streams of a process
+are shared.
+
+Usage:
+$ python3 -m dcli.daemon serve my_tool.commands:MyCommand /tmp/my-tool.sock &
+$ python3 -S path/to/dcli/daemon.py connect /tmp/my-tool.sock sub1 --foo
+"""
+
+import contextvars as _contextvars
+import io as _io
+import json as _json
+import os as _os
+import select as _select
+import socket as _socket
+import struct as _struct
+import sys as _sys
+
+# public symbols
+__all__ = ["Daemon", "serve", "client"]
+
+_FRAME = _struct.Struct("!BI")
+_CODE = _struct.Struct("!i")
+
+# frame channels
+_REQUEST = 0
+_EXIT = 0
+_STDOUT = 1
+_STDERR = 2
+_STDIN = 3
+
+
+def _sendFrame(conn: _socket.socket, channel: int, payload: bytes) -> None:
+    conn.sendall(_FRAME.pack(channel, len(payload)) + payload)
+
+
+def _recvExactly(conn: _socket.socket, size: int) -> bytes:
+    chunks = []
+    while size > 0:
+        chunk = conn.recv(size)
+        if not chunk:
+            raise ConnectionError("connection closed unexpectedly.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recvFrame(conn: _socket.socket):
+    channel, size = _FRAME.unpack(_recvExactly(conn, _FRAME.size))
+    return channel, _recvExactly(conn, size)
+
+
+class _OutputChannel(_io.RawIOBase):
+    def __init__(self, conn: _socket.socket, channel: int) -> None:
+        self._conn = conn
+        self._channel = channel
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        _sendFrame(self._conn, self._channel, bytes(b))
+        return len(b)
+
+
+class _InputChannel(_io.RawIOBase):
+    """
+    Class _InputChannel requests stdin from the client only when the command reads it.
+    """
+
+    def __init__(self, conn: _socket.socket, stdout) -> None:
+        self._conn = conn
+        self._stdout = stdout
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        # flush pending prompts before waiting for input.
+        self._stdout.flush()
+        _sendFrame(self._conn, _STDIN, _CODE.pack(len(b)))
+        _, data = _recvFrame(self._conn)
+        b[:len(data)] = data
+        return len(data)
+
+
+def _run(cmd, argv: list) -> int:
+    import traceback
+
+    try:
+        cmd(argv)
+    except SystemExit as e:
+        if e.code == None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=_sys.stderr)
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def _removeStaleSocket(path: str) -> None:
+    import stat
+
+    try:
+        mode = _os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"|{path}| exists and is not a socket.")
+
+    # only the socket of a daemon which is gone is replaced, never the one of a running daemon.
+    probe = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        _os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(f"another daemon is serving on |{path}|.")
+
+
+class Daemon:
+    """
+    Class Daemon serves command |cmd| on the Unix domain socket |path|.
+
+    Usage:
+    daemon = Daemon(MyCommand, "/tmp/my-command.sock")
+    daemon.serveForever()
+    """
+
+    def __init__(self, cmd, path) -> None:
+        self._command = cmd
+        self._path = _os.path.abspath(path)
+        self._closed = False
+
+        _removeStaleSocket(self._path)
+        self._socket = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        self._socket.bind(self._path)
+        self._socket.listen()
+
+    def serveForever(self, poll_interval: float = 0.5) -> None:
+        while not self._closed:
+            ready, _, _ = _select.select([self._socket], [], [], poll_interval)
+            if not ready or self._closed:
+                continue
+            conn, _ = self._socket.accept()
+            with conn:
+                try:
+                    self.handle(conn)
+                except (ConnectionError, OSError):
+                    # the client went away, nothing to report to.
+                    pass
+
+    def handle(self, conn: _socket.socket) -> None:
+        _, header = _recvFrame(conn)
+        request = _json.loads(header)
+
+        stdout = _io.TextIOWrapper(
+            _io.BufferedWriter(_OutputChannel(conn, _STDOUT)),
+            encoding="utf-8", errors="surrogateescape")
+        stderr = _io.TextIOWrapper(
+            _io.BufferedWriter(_OutputChannel(conn, _STDERR)),
+            encoding="utf-8", errors="backslashreplace", line_buffering=True)
+        stdin = _io.TextIOWrapper(
+            _io.BufferedReader(_InputChannel(conn, stdout)),
+            encoding="utf-8", errors="surrogateescape")
+
+        saved_cwd = _os.getcwd()
+        saved_env = dict(_os.environ)
+        saved_streams = (_sys.stdin, _sys.stdout, _sys.stderr)
+        saved_argv = _sys.argv
+        try:
+            _os.chdir(request["cwd"])
+            _os.environ.clear()
+            _os.environ.update(request["env"])
+            _sys.stdin, _sys.stdout, _sys.stderr = stdin, stdout, stderr
+            _sys.argv = [str(self._command), *request["argv"]]
+            # a fresh context isolates |dcli.commandLine()| of each request.
+            code = _contextvars.Context().run(_run, self._command,
+                                              request["argv"])
+        finally:
+            try:
+                stdout.flush()
+                stderr.flush()
+            finally:
+                _os.chdir(saved_cwd)
+                _os.environ.clear()
+                _os.environ.update(saved_env)
+                _sys.stdin, _sys.stdout, _sys.stderr = saved_streams
+                _sys.argv = saved_argv
+
+        _sendFrame(conn, _EXIT, _CODE.pack(code))
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._socket.close()
+            _os.unlink(self._path)
+
+
+def serve(cmd, path) -> None:
+    """Serve command |cmd| on the Unix domain socket |path| until interrupted."""
+
+    daemon = Daemon(cmd, path)
+    try:
+        daemon.serveForever()
+    finally:
+        daemon.close()
+
+
+def client(path, argv: list, *, stdin=None, stdout=None, stderr=None) -> int:
+    """Run |argv| on the daemon listening on |path| and return the exit code.
+
+    Keyword Arguments:
+        - path -- The Unix domain socket of the daemon
+        - argv -- The command line arguments, without the program name
+        - stdin -- The binary stream to read stdin from (default: sys.stdin.buffer)
+        - stdout -- The binary stream to write stdout into (default: sys.stdout.buffer)
+        - stderr -- The binary stream to write stderr into (default: sys.stderr.buffer)
+    """
+
+    stdin = stdin or _sys.stdin.buffer
+    stdout = stdout or _sys.stdout.buffer
+    stderr = stderr or _sys.stderr.buffer
+    outputs = {_STDOUT: stdout, _STDERR: stderr}
+
+    with _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM) as conn:
+        conn.connect(str(path))
+        header = {"argv": list(argv),
+                  "cwd": _os.getcwd(),
+                  "env": dict(_os.environ)}
+        _sendFrame(conn, _REQUEST, _json.dumps(header).encode("utf-8"))
+
+        while True:
+            channel, payload = _recvFrame(conn)
+            if channel in outputs:
+                outputs[channel].write(payload)
+                outputs[channel].flush()
+            elif channel == _STDIN:
+                size, = _CODE.unpack(payload)
+                _sendFrame(conn, _STDIN, stdin.read1(size))
+            else:
+                code, = _CODE.unpack(payload)
+                return code
+
+
+def main(argv: list) -> int:
+    if argv[:1] == ["connect"] and len(argv) >= 2:
+        return client(argv[1], argv[2:])
+
+    if argv[:1] == ["serve"] and len(argv) == 3:
+        from .dcli import _importReference
+        try:
+            serve(_importReference(argv[1]), argv[2])
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    print("usage: python3 -m dcli.daemon serve TARGET PATH\n"
+          "       python3 -S path/to/dcli/daemon.py connect PATH [ARG ...]",
+          file=_sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    _sys.exit(main(_sys.argv[1:]))
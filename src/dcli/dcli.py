@@ -1,11 +1,32 @@
 from argparse import (
     ArgumentParser as _ArgumentParser,
     Namespace as _Namespace,
-    HelpFormatter as _HelpFormatter
+    HelpFormatter as _HelpFormatter,
+    ArgumentError as _ArgumentError,
+    Action as _Action,
+    FileType as _FileType,
+    SUPPRESS as _SUPPRESS,
+    _SubParsersAction
 )
 from typing import (
-    Callable as _Callable, Any
+    Callable as _Callable, Any, Iterable as _Iterable,
+    NamedTuple as _NamedTuple
 )
+from importlib import import_module as _import_module
+from pathlib import Path as _Path
+import os as _os
+import sys as _sys
+import pickle as _pickle
+import shlex as _shlex
+import time as _time
+from contextvars import ContextVar as _ContextVar, copy_context as _copy_context
+from types import (
+    GeneratorType as _GeneratorType, FunctionType as _FunctionType, BuiltinFunctionType as _BuiltinFunctionType
+)
+from weakref import WeakValueDictionary as _WeakValueDictionary
+from threading import Lock as _Lock, RLock as _RLock
+from inspect import iscoroutinefunction as _iscoroutinefunction
+from functools import partial as _partial
 
 MAJOR_VERSION = 0
 MINOR_VERSION = 1
@@ -14,25 +35,1109 @@ PATCH_VERSION = 8
 VERSION = f"{MAJOR_VERSION}.{MINOR_VERSION}.{PATCH_VERSION}"
 
 # public symbols
-__all__ = ["arg", "command", "commandLine"]
+__all__ = ["arg", "command", "commandLine", "invocation", "cachedCommand",
+           "addHook", "removeHook", "resource", "Invocation", "BatchResult", "UsageError"]
 __version__ = VERSION
 
 
-_SUBCMD_SPECIFIER = "__sub_cmd_wrapper__"
-_ARGS: _Namespace = None
+_BATCH_SPECIFIER = "--dcli-batch"
+_PROFILE_SPECIFIER = "--dcli-profile"
+_PROFILE_MODES = ("json", "cprofile")
+_OUTPUT_SPECIFIER = "--output-format"
+_OUTPUT_DEST = "dcli_output_format"
+_OUTPUT_FORMATS = ("text", "jsonl", "csv")
+# the size of each write of streamed records.
+_OUTPUT_CHUNK = 1 << 16
+# the size of each read of streamed arguments.
+_STREAM_CHUNK = 1 << 20
+# the number of items buffered between two stages of a pipeline, which wake the next stage once per |_PIPELINE_CHUNK|.
+_PIPELINE_BUFFER = 1024
+_PIPELINE_CHUNK = 64
+# the seconds between checks of whether queued chunks of |runParallel()| have started.
+_PARALLEL_POLL = 0.01
+_PARSER_DEFAULTS = {"usage": None,
+                    "description": None,
+                    "epilog": None,
+                    "formatter_class": _HelpFormatter,
+                    "prefix_chars": "-",
+                    "fromfile_prefix_chars": None,
+                    "argument_default": None,
+                    "conflict_handler": "error",
+                    "add_help": True,
+                    "allow_abbrev": True,
+                    "exit_on_error": True}
+# parsers raise UsageError instead of printing usage and exiting, e.g. in batch mode.
+_RAISE_USAGE_ERROR = _ContextVar("dcli_raise_usage_error", default=False)
+# the command of a process worker in |runParallel()|.
+_WORKER_COMMAND = None
+# the (pre, post) hooks of phases, see |addHook()|.
+_HOOKS: tuple = ()
+# the commands with resources cached across invocations, released at exit.
+_RESOURCE_OWNERS: list = []
+_RESOURCE_LOCK = _Lock()
+# serializes building parsers and adding sub-commands, since lazy parsers are built while invoking.
+_BUILD_LOCK = _RLock()
+_MISSING = object()
+# bumped whenever a parser changes, which invalidates cached parses.
+_PARSER_VERSION = 0
+
+
+class Invocation:
+    """
+    Class Invocation holds the state of a single command invocation.
+
+    Each thread and each asyncio task has its own current invocation, so concurrent invocations never see each
+    other's state.
+
+    Attributes:
+        - args -- The parsed command line, i.e. |commandLine()|
+        - path -- The names of the invoked commands, from the root command to the sub-command
+        - timings -- The seconds spent in each phase, i.e. "parse" and "run"
+        - profile -- The mode of --dcli-profile, or None if not profiled
+        - phases -- The (phase, path, seconds) of each phase if profiled, see |addHook()|
+        - output -- The format of --output-format, or None if the root command has no such option
+        - resources -- The resources provided by commands with a |scope| in this invocation, by command
+        - input -- The return value of the previous stage of a pipeline, or an iterator over the items it yields,
+                   see |command()|
+    """
+
+    def __init__(self) -> None:
+        self.args: _Namespace = None
+        self.path: tuple = ()
+        self.timings: dict[str, float] = {}
+        self.profile: str = None
+        self.phases: list = None
+        self.output: str = None
+        self.resources: dict = None
+        self.input = None
+        self._profiler = None
+        # the pipe into the next stage of a pipeline.
+        self._pipe: _Pipe = None
+        # the (teardown, resource) of resources released at the end of this invocation.
+        self._teardowns: list = None
+        # names of the sub-commands entered while parsing.
+        self._chain: list = None
+        # the token of making this invocation current, and whether it is still running.
+        self._token = None
+        self._running = False
+
+
+_INVOCATION = _ContextVar("dcli_invocation", default=None)
 
 
 def commandLine() -> _Namespace:
-    global _ARGS
-    return _ARGS
+    invocation = _INVOCATION.get()
+    return invocation.args if invocation != None else None
+
+
+def invocation() -> Invocation:
+    """Return the current invocation of this thread or asyncio task, or None if no command has been invoked."""
+
+    return _INVOCATION.get()
+
+
+def resource(cmd):
+    """Return the resource provided by command |cmd|, declared with a |scope|, in the current invocation.
+
+    Usage:
+    @dcli.command("query", parent=Database)
+    def Query(ns):
+      connection = dcli.resource(Database)
+    """
+
+    invocation = _INVOCATION.get()
+    if invocation == None or invocation.resources == None or cmd not in invocation.resources:
+        raise LookupError(f"no resource of command |{cmd}| in the current invocation.")
+    return invocation.resources[cmd]
+
+
+def _releaseResources() -> None:
+    for cmd in list(_RESOURCE_OWNERS):
+        cmd.releaseResources()
+
+
+def addHook(pre: _Callable[[str, tuple], None] = None,
+            post: _Callable[[str, tuple, float], None] = None):
+    """Add hooks called around each phase of every invocation, and return the handle for |removeHook()|.
+
+    The phases are "build" for building the parser of a command, "parse" for parsing the command line, "parent" for
+    the function of each parent command and "leaf" for the function of the invoked command. |pre| is called with the
+    phase and the path of the command, and |post| also with the seconds spent in the phase. Without any hook, phases
+    are not observed at all.
+    """
+
+    global _HOOKS
+    hook = (pre, post)
+    _HOOKS = (*_HOOKS, hook)
+    return hook
+
+
+def removeHook(hook) -> None:
+    """Remove |hook| returned by |addHook()|."""
+
+    global _HOOKS
+    _HOOKS = tuple(x for x in _HOOKS if x is not hook)
+
+
+def _isObserved(invocation: Invocation) -> bool:
+    return bool(_HOOKS) or (invocation != None and invocation.phases != None)
+
+
+def _enter(phase: str, path: tuple) -> float:
+    for pre, _ in _HOOKS:
+        if pre != None:
+            pre(phase, path)
+    return _time.perf_counter()
+
+
+def _leave(phase: str, path: tuple, begin: float) -> float:
+    seconds = _time.perf_counter() - begin
+    invocation = _INVOCATION.get()
+    if invocation != None and invocation.phases != None:
+        invocation.phases.append((phase, path, seconds))
+    for _, post in _HOOKS:
+        if post != None:
+            post(phase, path, seconds)
+    return seconds
+
+
+def _enterSubCommand(name: str) -> None:
+    invocation = _INVOCATION.get()
+    if invocation != None and invocation._chain != None:
+        invocation._chain.append(name)
+
+
+def _profileMode(argv: list) -> tuple:
+    # the option is taken out of the command line, so that it may appear anywhere before "--", e.g. after a
+    # sub-command, while argparse never sees it.
+    mode = None
+    rest = []
+    for i, token in enumerate(argv):
+        if token == "--":
+            rest.extend(argv[i:])
+            break
+        if token == _PROFILE_SPECIFIER:
+            mode = _PROFILE_MODES[0]
+        elif token.startswith(f"{_PROFILE_SPECIFIER}=") and token.partition("=")[2] in _PROFILE_MODES:
+            mode = token.partition("=")[2]
+        else:
+            rest.append(token)
+    return mode, rest
+
+
+def _tearDown(invocation: Invocation) -> None:
+    teardowns, invocation._teardowns = invocation._teardowns, None
+    # the resources are released in the reverse order of their setup.
+    for teardown, value in reversed(teardowns):
+        teardown(value)
+
+
+class _OutputBuffer:
+    """
+    Class _OutputBuffer joins small writes into writes of |_OUTPUT_CHUNK| characters into |stream|.
+    """
+
+    __slots__ = ("_stream", "_chunks", "_size")
+
+    def __init__(self, stream) -> None:
+        self._stream = stream
+        self._chunks = []
+        self._size = 0
+
+    def write(self, text: str) -> None:
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= _OUTPUT_CHUNK:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._chunks:
+            self._stream.write("".join(self._chunks))
+            self._chunks.clear()
+            self._size = 0
+        self._stream.flush()
+
+
+def _writeRecords(records, format: str, stream) -> None:
+    """Write each record of generator |records| into |stream| as a line of |format|, i.e. text, jsonl or csv."""
+
+    buffer = _OutputBuffer(stream)
+    try:
+        if format == "jsonl":
+            import json
+            for record in records:
+                buffer.write(json.dumps(record, default=str, ensure_ascii=False))
+                buffer.write("\n")
+        elif format == "csv":
+            import csv
+            writer = csv.writer(buffer, lineterminator="\n")
+            for record in records:
+                if isinstance(record, dict):
+                    # the keys of the first record are the header.
+                    if not isinstance(writer, csv.DictWriter):
+                        writer = csv.DictWriter(buffer, list(record), lineterminator="\n")
+                        writer.writeheader()
+                    writer.writerow(record)
+                elif isinstance(record, (list, tuple)):
+                    writer.writerow(record)
+                else:
+                    writer.writerow((record,))
+        else:
+            for record in records:
+                buffer.write(f"{record}\n")
+        buffer.flush()
+    except BrokenPipeError:
+        # the reader went away, e.g. "| head", so the rest of the output is dropped quietly.
+        records.close()
+        if stream is _sys.stdout:
+            try:
+                devnull = _os.open(_os.devnull, _os.O_WRONLY)
+                _os.dup2(devnull, stream.fileno())
+            except (OSError, ValueError, AttributeError):
+                pass
+        raise SystemExit(1)
+
+
+class _Pipe:
+    """
+    Class _Pipe passes the result of a pipeline stage to the next stage.
+
+    The stage sends either its return value, or the items yielded by its generator as they are produced, so the
+    stages run side by side. Items are put into a shared buffer, and the next stage is woken up once per
+    |_PIPELINE_CHUNK| items, or at once while it waits for items, with at most |_PIPELINE_BUFFER| items pending.
+    Once the next stage is done, the pipe is closed and the rest of the items are dropped.
+    """
+
+    __slots__ = ("_queue", "_items", "_waiting", "_closed")
+
+    # kinds of messages
+    _VALUE = 0
+    _ITEMS = 1
+    _CHUNK = 2
+    _END = 3
+    _ERROR = 4
+
+    def __init__(self) -> None:
+        import queue
+        from collections import deque
+        self._queue = queue.Queue(_PIPELINE_BUFFER // _PIPELINE_CHUNK)
+        self._items = deque()
+        self._waiting = False
+        self._closed = False
+
+    def __send(self, kind: int, value=None) -> bool:
+        if self._closed:
+            return False
+        self._queue.put((kind, value))
+        return True
+
+    def feed(self, result) -> None:
+        """Send |result| of a stage, draining it if it is a generator."""
+
+        if not isinstance(result, _GeneratorType):
+            self.__send(self._VALUE, result)
+            return
+
+        self.__send(self._ITEMS)
+        try:
+            items = self._items
+            count = 0
+            for item in result:
+                items.append(item)
+                count += 1
+                # the next stage checks the buffer after it flags waiting, so an item is never left behind.
+                if count >= _PIPELINE_CHUNK or self._waiting:
+                    self._waiting = False
+                    if not self.__send(self._CHUNK):
+                        return
+                    count = 0
+        finally:
+            result.close()
+        self.__send(self._END)
+
+    def fail(self, error: BaseException) -> None:
+        self.__send(self._ERROR, error)
+
+    def receive(self):
+        """Return the return value of the previous stage, or an iterator over the items it yields."""
+
+        kind, value = self._queue.get()
+        if kind == self._ERROR:
+            raise value
+        if kind == self._VALUE:
+            return value
+        return self.__items()
+
+    def __items(self):
+        items = self._items
+        while True:
+            while items:
+                yield items.popleft()
+            self._waiting = True
+            if items:
+                self._waiting = False
+                continue
+            kind, value = self._queue.get()
+            self._waiting = False
+            if kind == self._ERROR:
+                raise value
+            if kind == self._END:
+                # the items sent before the end are still buffered.
+                while items:
+                    yield items.popleft()
+                return
+
+    def close(self) -> None:
+        self._closed = True
+        self._items.clear()
+        # unblocks a sender waiting for room, which sends nothing after that.
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+
+class UsageError(Exception):
+    """
+    Class UsageError is raised for an invalid command line when the usage is not printed, e.g. in batch mode.
+    """
+
+    def __init__(self, message: str, prog: str) -> None:
+        super().__init__(message)
+        self.prog = prog
+
+    def __reduce__(self):
+        return UsageError, (str(self), self.prog)
+
+
+class BatchResult(_NamedTuple):
+    """
+    Class BatchResult is the result of a single command line in |runBatch()|.
+    """
+
+    argv: list
+    code: int
+    value: Any = None
+    error: BaseException = None
+
+
+def _editDistance(a: str, b: str) -> int:
+    """Return the edit distance of |a| and |b|, where swapping two adjacent characters is one edit."""
+
+    previous = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(row[j] + 1, current[j - 1] + 1, row[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous[j - 2] + 1)
+        previous, row = row, current
+    return row[-1]
+
+
+def _deletions(word: str) -> set:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class _NameIndex:
+    """
+    Class _NameIndex indexes option strings or sub-command names for prefix lookups and "did you mean" suggestions.
+
+    Prefixes are looked up by bisection in the sorted names, i.e. a flattened trie, and suggestions in the deletion
+    neighborhood of the names, which holds every name within one edit or one swap of adjacent characters (and many
+    within two edits), so neither lookup scans all names.
+    """
+
+    __slots__ = ("_order", "_sorted", "_lengths", "_deletions")
+
+    def __init__(self, names) -> None:
+        self._order = {x: i for i, x in enumerate(names)}
+        self._sorted = sorted(self._order)
+        # built on the first suggestion, since most command lines have no typos.
+        self._lengths: dict = None
+        self._deletions: dict = {}
+
+    def prefixed(self, prefix: str) -> list:
+        """Return the names starting with |prefix|, in the order they were added."""
+
+        from bisect import bisect_left
+
+        result = []
+        for i in range(bisect_left(self._sorted, prefix), len(self._sorted)):
+            if not self._sorted[i].startswith(prefix):
+                break
+            result.append(self._sorted[i])
+        return sorted(result, key=self._order.__getitem__)
+
+    def __neighborhood(self, length: int) -> dict:
+        # the deletion neighborhood is built per length of names, only for the lengths next to a mistyped word.
+        deletions = self._deletions.get(length)
+        if deletions == None:
+            deletions = self._deletions[length] = {}
+            for name in self._lengths.get(length, ()):
+                for key in _deletions(name) | {name}:
+                    names = deletions.get(key)
+                    if names == None:
+                        deletions[key] = [name]
+                    else:
+                        names.append(name)
+        return deletions
+
+    def suggest(self, word: str, limit: int = 3) -> list:
+        """Return at most |limit| names close to |word|, the closest first."""
+
+        if self._lengths == None:
+            self._lengths = {}
+            for name in self._order:
+                self._lengths.setdefault(len(name), []).append(name)
+
+        keys = _deletions(word) | {word}
+        candidates = set()
+        for length in (len(word) - 1, len(word), len(word) + 1):
+            deletions = self.__neighborhood(length)
+            for key in keys:
+                candidates.update(deletions.get(key, ()))
+        ranked = sorted((_editDistance(word, x), self._order[x], x) for x in candidates)
+        result = [x for distance, _, x in ranked if distance <= 2]
+
+        # a word which is a prefix of names is suggested their full names.
+        if len(word) > 1:
+            result += [x for x in self.prefixed(word) if x not in result]
+        return result[:limit]
+
+
+class _OptionView:
+    """
+    Class _OptionView is a parser with only some of its option strings, to run argparse's lookups over them.
+    """
+
+    __slots__ = ("_parser", "_option_string_actions")
+
+    def __init__(self, parser, option_string_actions: dict) -> None:
+        self._parser = parser
+        self._option_string_actions = option_string_actions
+
+    def __getattr__(self, name: str):
+        return getattr(self._parser, name)
+
+
+class _Parser(_ArgumentParser):
+    # the help cache of the owner command, assigned once the parser is built.
+    _help_cache: dict = None
+    # the index of option strings, built on the first abbreviated option.
+    _option_index: _NameIndex = None
+
+    def __formatted(self, kind: str, format: _Callable[[], str]) -> str:
+        if self._help_cache == None:
+            return format()
+
+        import shutil
+        key = (kind, self.formatter_class, shutil.get_terminal_size().columns)
+        text = self._help_cache.get(key)
+        if text == None:
+            text = self._help_cache[key] = format()
+        return text
+
+    def format_help(self) -> str:
+        return self.__formatted("help", super().format_help)
+
+    def format_usage(self) -> str:
+        return self.__formatted("usage", super().format_usage)
+
+    def _add_action(self, action):
+        global _PARSER_VERSION
+        _PARSER_VERSION += 1
+        if self._help_cache:
+            self._help_cache.clear()
+        self._option_index = None
+        return super()._add_action(action)
+
+    def _remove_action(self, action) -> None:
+        global _PARSER_VERSION
+        _PARSER_VERSION += 1
+        self._option_index = None
+        super()._remove_action(action)
+
+    def _get_option_tuples(self, option_string: str) -> list:
+        index = self._option_index
+        if index == None:
+            index = self._option_index = _NameIndex(self._option_string_actions)
+
+        # argparse matches the options starting with the part before "=", or equal to the first two characters.
+        names = index.prefixed(option_string.partition("=")[0])
+        if option_string[:2] in self._option_string_actions and option_string[:2] not in names:
+            names.append(option_string[:2])
+        view = _OptionView(self, {x: self._option_string_actions[x] for x in names})
+        return _ArgumentParser._get_option_tuples(view, option_string)
+
+    def _check_value(self, action, value) -> None:
+        if isinstance(action, _SubCommandsAction) and value not in action.choices:
+            # argparse names the action by all its choices, which is noise on wide commands.
+            raise _ArgumentError(action if len(action.choices) <= 20 else None, action.invalidChoice(value))
+        super()._check_value(action, value)
+
+    def set_defaults(self, **kwargs) -> None:
+        global _PARSER_VERSION
+        _PARSER_VERSION += 1
+        if self._help_cache:
+            self._help_cache.clear()
+        super().set_defaults(**kwargs)
+
+    def _get_values(self, action, arg_strings: list):
+        # array and stream arguments convert their values by themselves, in bulk.
+        if not arg_strings or not isinstance(action, (_ArrayAction, _StreamAction)):
+            return super()._get_values(action, arg_strings)
+
+        if "--" in arg_strings:
+            arg_strings = list(arg_strings)
+            arg_strings.remove("--")
+        if action.nargs in (None, "?") and len(arg_strings) == 1:
+            return arg_strings[0]
+        return arg_strings
+
+    def error(self, message: str):
+        if _RAISE_USAGE_ERROR.get():
+            raise UsageError(message, self.prog)
+        super().error(message)
 
 
 class _ArgumentWrapper:
+    __slots__ = ("args", "kwargs", "__weakref__")
+
     def __init__(self, *args, **kwargs) -> None:
         self.args = args
         self.kwargs = kwargs
 
 
+# the shared argument specs of the living commands, see |_internArgument()|.
+_ARGUMENT_SPECS = _WeakValueDictionary()
+# values which are never changed in place, and types and functions, which are compared by identity.
+_IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes, type, _FunctionType, _BuiltinFunctionType)
+
+
+def _specKey(value):
+    # the type is a part of the key, since 1, 1.0 and True are equal.
+    if isinstance(value, tuple):
+        return (type(value), tuple(_specKey(x) for x in value))
+    if not isinstance(value, _IMMUTABLE_TYPES):
+        raise TypeError(f"mutable value |{value!r}|.")
+    return (type(value), value)
+
+
+def _internArgument(args: tuple, kwargs: dict) -> _ArgumentWrapper:
+    """Return the shared _ArgumentWrapper of |args| and |kwargs|, so that equal arguments of many commands are stored
+    only once."""
+
+    try:
+        key = (args, tuple((k, _specKey(v)) for k, v in kwargs.items()))
+    except TypeError:
+        # mutable values, e.g. a list default, are not shared, since a command may change them.
+        return _ArgumentWrapper(*args, **kwargs)
+
+    spec = _ARGUMENT_SPECS.get(key)
+    if spec == None:
+        spec = _ARGUMENT_SPECS[key] = _ArgumentWrapper(*args, **kwargs)
+    return spec
+
+
+def _sizeof(obj, seen: set) -> int:
+    """Return the deep size of |obj| in bytes, excluding objects in |seen|, other commands, functions and types."""
+
+    import types
+
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or (item is not obj and isinstance(item, _CommandWrapper)) or \
+                isinstance(item, (type, types.ModuleType, types.FunctionType,
+                                  types.BuiltinFunctionType, types.MethodType)):
+            continue
+        seen.add(id(item))
+        size += _sys.getsizeof(item)
+
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        if hasattr(item, "__dict__"):
+            stack.append(item.__dict__)
+        for cls in type(item).__mro__:
+            for slot in cls.__dict__.get("__slots__", ()):
+                stack.append(getattr(item, slot, None))
+
+    return size
+
+
+def _importReference(reference: str):
+    module, _, qualname = reference.partition(":")
+    obj = _import_module(module)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class _LazyFunction:
+    """
+    Class _LazyFunction imports the function of a "module:qualname" reference on its first call.
+    """
+
+    __slots__ = ("reference", "_fn")
+
+    def __init__(self, reference: str) -> None:
+        self.reference = reference
+        self._fn = None
+
+    def resolve(self):
+        if self._fn == None:
+            fn = _importReference(self.reference)
+            # decorated functions are replaced by their _CommandWrapper.
+            self._fn = fn._fn if isinstance(fn, _CommandWrapper) else fn
+        return self._fn
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+
+def _isAsync(fn) -> bool:
+    if isinstance(fn, _LazyFunction):
+        fn = fn.resolve()
+    while isinstance(fn, _partial):
+        fn = fn.func
+    # callable objects are async if their __call__ is.
+    return _iscoroutinefunction(fn) or _iscoroutinefunction(getattr(fn, "__call__", None))
+
+
+class _ArgumentStream:
+    """
+    Class _ArgumentStream is the value of an argument with |stream|, which yields the converted values only when it is
+    iterated.
+
+    A value "@path" is replaced by the lines of the file, and "-" by the lines of stdin, which are read and converted
+    in chunks of about |_STREAM_CHUNK| bytes, so that memory stays bounded however many values are passed. Empty lines
+    are skipped. The values can be iterated only once if they come from stdin.
+    """
+
+    __slots__ = ("_values", "_type", "_mmap", "_parser", "_name")
+
+    def __init__(self, values: list, type, mmap: bool, parser, name: str) -> None:
+        self._values = values
+        self._type = type
+        self._mmap = mmap
+        self._parser = parser
+        self._name = name
+
+    def __iter__(self):
+        values = []
+        for value in self._values:
+            if value != "-" and not value.startswith("@"):
+                values.append(value)
+                continue
+            if values:
+                yield from self.__convert(values, "<command line>", 0)
+                values = []
+            if value == "-":
+                yield from self.__read(_sys.stdin, "<stdin>")
+            elif self._mmap:
+                yield from self.__map(value[1:])
+            else:
+                with open(value[1:]) as f:
+                    yield from self.__read(f, value[1:])
+        if values:
+            yield from self.__convert(values, "<command line>", 0)
+
+    def __read(self, f, source: str):
+        line = 0
+        while True:
+            lines = f.readlines(_STREAM_CHUNK)
+            if not lines:
+                return
+            yield from self.__convert(lines, source, line)
+            line += len(lines)
+
+    def __map(self, path: str):
+        import mmap
+
+        with open(path, "rb") as f:
+            if _os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                line = 0
+                begin = 0
+                while begin < len(m):
+                    end = m.find(b"\n", begin + _STREAM_CHUNK)
+                    end = len(m) if end < 0 else end + 1
+                    lines = m[begin:end].decode().splitlines()
+                    yield from self.__convert(lines, path, line)
+                    line += len(lines)
+                    begin = end
+
+    def __convert(self, lines: list, source: str, line: int) -> list:
+        values = [x.rstrip("\r\n") for x in lines]
+        if self._type == None:
+            return [x for x in values if x]
+        try:
+            return [self._type(x) for x in values if x]
+        except (TypeError, ValueError):
+            for i, value in enumerate(values):
+                try:
+                    if value:
+                        self._type(value)
+                except (TypeError, ValueError):
+                    name = getattr(self._type, "__name__", repr(self._type))
+                    self._parser.error(f"argument {self._name}: invalid {name} value: "
+                                       f"{value!r} ({source}:{line + i + 1})")
+            raise
+
+
+class _StreamAction(_Action):
+    """
+    Class _StreamAction stores the values of an argument as an |_ArgumentStream| instead of a list.
+    """
+
+    def __init__(self, option_strings, dest, nargs="*", stream_type=None, mmap=False, **kwargs) -> None:
+        super().__init__(option_strings, dest, nargs=nargs, **kwargs)
+        self.stream_type = stream_type
+        self.mmap = mmap
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        if isinstance(values, str):
+            values = [values]
+        name = "/".join(self.option_strings) or self.metavar or self.dest
+        for value in values:
+            if value.startswith("@") and not _os.path.isfile(value[1:]):
+                raise _ArgumentError(self, f"can't open '{value[1:]}'")
+        setattr(namespace, self.dest,
+                _ArgumentStream(values, self.stream_type, self.mmap, parser, name))
+
+
+class _ProfileAction(_Action):
+    """
+    Class _ProfileAction shows --dcli-profile in the help, while the option itself is taken out of the command line
+    before it is parsed, see |_profileMode()|.
+    """
+
+    def __init__(self, option_strings, dest, **kwargs) -> None:
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        # only abbreviations of the option get here.
+        raise _ArgumentError(self, f"use {_PROFILE_SPECIFIER} or {_PROFILE_SPECIFIER}=MODE in full")
+
+
+class _ArrayAction(_Action):
+    """
+    Class _ArrayAction converts the values of an argument in bulk into an |array.array| of |typecode|.
+    """
+
+    def __init__(self, option_strings, dest, nargs="+", typecode="l", **kwargs) -> None:
+        super().__init__(option_strings, dest, nargs=nargs, **kwargs)
+        self.typecode = typecode
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from array import array
+
+        if not isinstance(values, (str, list)):
+            # the const or default of nargs="?" without a value is stored as it is.
+            setattr(namespace, self.dest, values)
+            return
+        if isinstance(values, str):
+            values = [values]
+        convert = float if self.typecode in "fd" else int
+        try:
+            result = array(self.typecode, map(convert, values))
+        except (TypeError, ValueError, OverflowError):
+            # convert one by one to find the offending value.
+            result = array(self.typecode)
+            for i, value in enumerate(values):
+                try:
+                    result.append(convert(value))
+                except (TypeError, ValueError, OverflowError) as e:
+                    raise _ArgumentError(
+                        self, f"invalid {self.typecode!r} value at index {i}: {value!r} ({e})")
+        setattr(namespace, self.dest, result)
+
+
+class _SlottedNamespace:
+    """
+    Class _SlottedNamespace is the base of the namespace classes generated for commands with |slots|.
+
+    It behaves like |argparse.Namespace|, except that only the dests of the command and its parents can be set, and
+    it is pickled as an |argparse.Namespace|.
+    """
+
+    __slots__ = ()
+
+    def _get_kwargs(self) -> list:
+        return [(x, getattr(self, x)) for x in self.__slots__ if hasattr(self, x)]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self._get_kwargs())})"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, _SlottedNamespace):
+            return dict(self._get_kwargs()) == dict(other._get_kwargs())
+        if isinstance(other, _Namespace):
+            return dict(self._get_kwargs()) == vars(other)
+        return NotImplemented
+
+    def __contains__(self, key: str) -> bool:
+        return hasattr(self, key)
+
+    def __reduce__(self):
+        return (_Namespace, (), dict(self._get_kwargs()))
+
+
+def _namespaceClass(nodes: list):
+    """Generate the namespace class with the dests of |nodes| as slots, or None if a dest is not a valid slot."""
+
+    fields = {}
+    for cmd in nodes:
+        parser = cmd._getParser()
+        for action in parser._actions:
+            if action.dest is not _SUPPRESS:
+                fields[action.dest] = None
+        fields.update(dict.fromkeys(parser._defaults))
+
+    # names like "__foo" would be mangled, and others are not allowed in __slots__.
+    if not all(x.isidentifier() and (not x.startswith("__") or x.endswith("__")) for x in fields):
+        return None
+    return type("Namespace", (_SlottedNamespace,), {"__slots__": tuple(fields), "__module__": __name__})
+
+
+class _SubCommandsAction(_SubParsersAction):
+    """
+    Class _SubCommandsAction is a |_SubParsersAction| whose choices are _CommandWrapper.
+
+    The help of each choice is registered up front, but the parser of a lazy sub-command is built only once its name
+    shows up in the command line.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._commands: dict[str, _CommandWrapper] = {}
+        # the index of names, built on the first invalid choice.
+        self._index: _NameIndex = None
+
+    def addCommand(self, cmd, *, lazy: bool) -> None:
+        global _PARSER_VERSION
+        assert cmd._name not in self._name_parser_map, \
+            f"add sub-command with duplicate name |{cmd._name}|."
+
+        _PARSER_VERSION += 1
+        self._index = None
+        self._choices_actions.append(
+            self._ChoicesPseudoAction(cmd._name, (), cmd._brief_help))
+        self._commands[cmd._name] = cmd
+        # the parser of a mounted command is shared with its other parents.
+        self._name_parser_map[cmd._name] = None if lazy and cmd._parser == None \
+            else cmd._getParser()
+
+    def invalidChoice(self, value: str) -> str:
+        if self._index == None:
+            self._index = _NameIndex(self._name_parser_map)
+
+        suggestions = self._index.suggest(value)
+        if suggestions:
+            return f"invalid choice: {value!r} (did you mean {' or '.join(map(repr, suggestions))}?)"
+        if len(self._name_parser_map) > 20:
+            return f"invalid choice: {value!r} (see -h for the {len(self._name_parser_map)} choices)"
+        return f"invalid choice: {value!r} (choose from {', '.join(map(repr, self._name_parser_map))})"
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        name = values[0]
+        if self._name_parser_map.get(name) is None and name in self._commands:
+            self._name_parser_map[name] = self._commands[name]._getParser()
+        _enterSubCommand(name)
+        super().__call__(parser, namespace, values, option_string)
+
+
+class _DispatchTable:
+    """
+    Class _DispatchTable is the flat table of options, positionals and sub-commands of a command for |compile()|.
+
+    A command is |simple| only if its command line can be resolved without argparse, i.e. it reads no files of
+    arguments, has no mutually exclusive groups, and all of its arguments take exactly zero or one value.
+    """
+
+    def __init__(self, parser: _ArgumentParser) -> None:
+        self.parser = parser
+        self.options = {}
+        self.positionals = []
+        self.required = []
+        self.subcommands: _SubCommandsAction = None
+        self.simple = parser.fromfile_prefix_chars == None and \
+            not parser._mutually_exclusive_groups
+
+        for action in parser._actions:
+            if isinstance(action, _SubCommandsAction):
+                self.subcommands = action
+            elif action.nargs not in (None, 0):
+                self.simple = False
+            elif action.option_strings:
+                for option in action.option_strings:
+                    self.options[option] = action
+                if action.required:
+                    self.required.append(action)
+            elif self.subcommands != None:
+                # positionals after sub-commands are left to argparse.
+                self.simple = False
+            else:
+                self.positionals.append(action)
+
+
+def _planDispatch(cmd, argv: list, begin: int):
+    """Resolve |argv| from |begin| into the (table, calls, sub-command plan) of |cmd|, or None to fall back."""
+
+    table: _DispatchTable = cmd._dispatchTable()
+    if not table.simple:
+        return None
+
+    prefix_chars = table.parser.prefix_chars
+    calls = []
+    position = 0
+    index = begin
+    while index < len(argv):
+        token = argv[index]
+        if len(token) > 1 and token[0] in prefix_chars:
+            action = table.options.get(token)
+            head, eq, value = token.partition("=")
+            if action != None and action.nargs == 0:
+                calls.append((action, token, []))
+                index += 1
+            elif action != None:
+                # values looking like options are left to argparse.
+                if index + 1 == len(argv) or argv[index + 1][:1] in prefix_chars:
+                    return None
+                calls.append((action, token, [argv[index + 1]]))
+                index += 2
+            elif eq and head in table.options and table.options[head].nargs == None:
+                calls.append((table.options[head], head, [value]))
+                index += 1
+            else:
+                return None
+        elif position < len(table.positionals):
+            calls.append((table.positionals[position], None, [token]))
+            position += 1
+            index += 1
+        elif table.subcommands != None and token in table.subcommands._commands:
+            sub = table.subcommands._commands[token]
+            plan = _planDispatch(sub, argv, index + 1)
+            return None if plan == None else (table, calls, token, plan)
+        else:
+            return None
+
+    seen = set(x[0] for x in calls)
+    if position < len(table.positionals) or any(x not in seen for x in table.required):
+        return None
+    if table.subcommands != None and table.subcommands.required:
+        return None
+    return (table, calls, None, None)
+
+
+def _runDispatch(plan, namespace: _Namespace) -> _Namespace:
+    """Apply |plan| to |namespace| in the same way as |ArgumentParser.parse_known_args()|."""
+
+    table, calls, name, sub = plan
+    parser = table.parser
+
+    for action in parser._actions:
+        if action.dest is not _SUPPRESS and not hasattr(namespace, action.dest) \
+                and action.default is not _SUPPRESS:
+            setattr(namespace, action.dest, action.default)
+    for dest, value in parser._defaults.items():
+        if not hasattr(namespace, dest):
+            setattr(namespace, dest, value)
+
+    seen = set()
+    for action, option_string, values in calls:
+        seen.add(action)
+        values = parser._get_values(action, values)
+        if values is not _SUPPRESS:
+            action(parser, namespace, values, option_string)
+
+    if sub != None:
+        seen.add(table.subcommands)
+        _enterSubCommand(name)
+        # sub-commands parse into a new namespace, like |_SubParsersAction|.
+        for key, value in vars(_runDispatch(sub, _Namespace())).items():
+            setattr(namespace, key, value)
+
+    for action in parser._actions:
+        if action not in seen and isinstance(action.default, str) and \
+                hasattr(namespace, action.dest) and \
+                action.default is getattr(namespace, action.dest):
+            setattr(namespace, action.dest,
+                    parser._get_value(action, action.default))
+
+    return namespace
+
+
+def _copyValue(value):
+    from copy import deepcopy
+
+    # the values of a cached parse are never shared with the commands, but immutable ones need no copy.
+    if value == None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    return deepcopy(value)
+
+
+class _ParseCache:
+    """
+    Class _ParseCache holds the parsed arguments and the invoked sub-commands of the latest command lines, see
+    |cacheParses()|.
+    """
+
+    __slots__ = ("_entries", "_maxsize", "_lock", "_version", "hits", "misses")
+
+    def __init__(self, maxsize: int) -> None:
+        from collections import OrderedDict
+        self._entries = OrderedDict()
+        self._maxsize = maxsize
+        self._lock = _Lock()
+        self._version = _PARSER_VERSION
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        """Return a copy of the (namespace, sub-command names) of |key|, or None if it is not cached."""
+
+        with self._lock:
+            if self._version != _PARSER_VERSION:
+                self._entries.clear()
+                self._version = _PARSER_VERSION
+            entry = self._entries.get(key)
+            if entry == None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        values, chain = entry
+        namespace = _Namespace()
+        for dest, value in values:
+            setattr(namespace, dest, _copyValue(value))
+        return namespace, list(chain)
+
+    def put(self, key: tuple, values: dict, chain: list) -> None:
+        try:
+            entry = (tuple((k, _copyValue(v)) for k, v in values.items()), tuple(chain))
+        except Exception:
+            # values which cannot be copied are parsed again each time.
+            return
+        with self._lock:
+            # the entry was parsed by the latest parsers, e.g. of lazy sub-commands built while parsing.
+            if self._version != _PARSER_VERSION:
+                self._entries.clear()
+                self._version = _PARSER_VERSION
+            self._entries[key] = entry
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def info(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "maxsize": self._maxsize, "size": len(self._entries)}
+
+
 class _CommandWrapper:
     """
     Class _CommandWrapper is an |argparse| wrapper for decorated function.
@@ -43,8 +1148,16 @@ class _CommandWrapper:
       ...
 
     Then calling |Command()| directly will invoke argpaser.parse_args() and pass return value into the origin function |Command(args)|.
+
+    The parser is built from |args| and |kwargs| on first use, and a lazy command builds the parsers of its
+    sub-commands only when they are invoked.
     """
 
+    __slots__ = ("_name", "_fn", "_parser", "_subparsers", "_subcommands", "_parent_cmd", "_required_sub",
+                 "_skip_if_has_subcmd", "_brief_help", "_args", "_kwargs", "_lazy", "_target", "_compiled", "_table",
+                 "_help_cache", "_profile", "_slots", "_namespaces", "_scope", "_teardown", "_resources",
+                 "_pipeline", "_cacheable", "_parse_cache")
+
     def __init__(self, name: str,
                  fn: _Callable[[_Namespace], Any],
                  parser: _ArgumentParser,
@@ -54,7 +1167,14 @@ class _CommandWrapper:
                  skip_if_has_subcmd: bool = True,
                  help: str = "",
                  args = None,
-                 kwargs = None) -> None:
+                 kwargs = None,
+                 lazy: bool = False,
+                 slots: bool = False,
+                 scope=None,
+                 teardown=None,
+                 pipeline: str = None,
+                 cacheable: bool = True,
+                 target: str = None) -> None:
         self._name = name
         self._fn = fn
         self._parser = parser
@@ -64,35 +1184,686 @@ class _CommandWrapper:
         self._required_sub = required_subcmd
         self._skip_if_has_subcmd = skip_if_has_subcmd
         self._brief_help = help
-        self._args = args
-        self._kwargs = kwargs
+        self._args = args if args != None else ()
+        self._kwargs = kwargs if kwargs != None else {}
+        self._lazy = lazy
+        self._slots = slots
+        # the generated namespace class by the parsed commands, see |_namespaceClass()|.
+        self._namespaces: dict = None
+        self._scope = scope
+        self._teardown = teardown
+        # the cached (resource, deadline) by the values of the arguments of this command.
+        self._resources: dict = None
+        self._pipeline = pipeline
+        self._cacheable = cacheable
+        # the parses of the latest command lines, see |cacheParses()|.
+        self._parse_cache: _ParseCache = None
+        self._target = target
+        self._compiled = False
+        self._table: _DispatchTable = None
+        # the formatted help and usage by (kind, formatter_class, terminal width), once the parser is built.
+        self._help_cache: dict = None
+        self._profile = any(_PROFILE_SPECIFIER in x.args for x in self._args
+                            if isinstance(x, _ArgumentWrapper))
 
     def __str__(self) -> str:
         return self._name
 
-    def __getSubCommand(self, args: _Namespace):
-        if not hasattr(args, _SUBCMD_SPECIFIER) or not isinstance(getattr(args, _SUBCMD_SPECIFIER), _CommandWrapper):
-            return None
+    def __call__(self, args=None, namespace=None) -> Any:
+        if self._parent_cmd == None:
+            argv = _sys.argv[1:] if args == None else args
+            if len(argv) == 2 and argv[0] == _BATCH_SPECIFIER:
+                return self.__runBatchFile(argv[1])
+            if self._pipeline != None and self._pipeline in argv:
+                return self.__runPipeline(argv)
+
+        return self.__invoke(args, namespace, None)
+
+    def _callParsed(self, argv: list, values: dict, chain: list) -> Any:
+        """Run command line |argv| of this command, already parsed into the dests |values| and the names |chain| of
+        the invoked sub-commands, e.g. by a dispatcher generated by |dcli.codegen|."""
+
+        return self.__invoke(argv, None, (_Namespace(**values), list(chain)))
+
+    def __invoke(self, args, namespace, parsed: tuple) -> Any:
+        invocation, args = self.__begin(args)
+        try:
+            handlers = self.__parse(invocation, args, namespace, parsed)
+            if any(_isAsync(x._fn) for _, x in handlers):
+                import asyncio
+                return asyncio.run(self.__arun(handlers, invocation))
+            return self.__run(handlers, invocation)
+        finally:
+            try:
+                if invocation.profile in _PROFILE_MODES:
+                    self.__report(invocation)
+            finally:
+                self.__end(invocation)
+
+    async def acall(self, args=None, namespace=None) -> Any:
+        """Awaitable version of |__call__()|, which awaits "async def" functions of the command in order.
+
+        Usage:
+        await asyncio.gather(MyCommand.acall(["sub1"]), MyCommand.acall(["sub2"]))
+        """
+
+        invocation, args = self.__begin(args)
+        try:
+            handlers = self.__parse(invocation, args, namespace)
+            return await self.__arun(handlers, invocation)
+        finally:
+            try:
+                if invocation.profile in _PROFILE_MODES:
+                    self.__report(invocation)
+            finally:
+                self.__end(invocation)
+
+    def __begin(self, args) -> tuple:
+        invocation = Invocation()
+        invocation._token = _INVOCATION.set(invocation)
+        invocation._running = True
+
+        if self._profile:
+            invocation.profile, argv = _profileMode(_sys.argv[1:] if args == None else args)
+            if invocation.profile != None:
+                args = argv
+        if invocation.profile in _PROFILE_MODES:
+            invocation.phases = []
+        if invocation.profile == "cprofile":
+            import cProfile
+            invocation._profiler = cProfile.Profile()
+            invocation._profiler.enable()
+
+        return invocation, args
+
+    def __end(self, invocation: Invocation) -> None:
+        invocation._running = False
+        token, invocation._token = invocation._token, None
+        # a command invoked by a running one, e.g. from its function, gives the state of the caller back, while the
+        # last invocation of the caller stays readable once it returns.
+        outer = token.old_value
+        if isinstance(outer, Invocation) and outer._running:
+            _INVOCATION.reset(token)
+
+    def __report(self, invocation: Invocation) -> None:
+        if invocation._profiler != None:
+            import pstats
+            invocation._profiler.disable()
+            pstats.Stats(invocation._profiler, stream=_sys.stderr) \
+                .sort_stats("cumulative").print_stats(30)
         else:
-            return getattr(args, _SUBCMD_SPECIFIER)
+            import json
+            print(json.dumps({"path": invocation.path,
+                              "timings": invocation.timings,
+                              "phases": [{"phase": phase, "path": path, "seconds": seconds}
+                                         for phase, path, seconds in invocation.phases]}),
+                  file=_sys.stderr)
 
-    def __call__(self, args=None, namespace=None) -> Any:
-        global _ARGS
-        _ARGS = self._parser.parse_args(args, namespace)
-        sub: _CommandWrapper = self.__getSubCommand(_ARGS)
-        if sub:
-            return sub.__runImpl(_ARGS)
+    def __parse(self, invocation: Invocation, args, namespace, parsed: tuple = None) -> list:
+        observed = _isObserved(invocation)
+        path = self.__path() if observed else None
+        begin = _enter("parse", path) if observed else _time.perf_counter()
+        key = values = None
+        try:
+            if parsed != None:
+                invocation.args, invocation._chain = parsed
+            elif self._parse_cache != None and namespace == None:
+                key = tuple(_sys.argv[1:] if args == None else args)
+                cached = self._parse_cache.get(key)
+                if cached != None:
+                    invocation.args, invocation._chain = cached
+                    key = None
+            if self._compiled and invocation.args == None and namespace == None:
+                invocation._chain = []
+                invocation.args = self.__dispatch(
+                    _sys.argv[1:] if args == None else list(args))
+            if invocation.args == None:
+                invocation._chain = []
+                invocation.args = self._getParser().parse_args(args, namespace)
+            if key != None:
+                values = dict(vars(invocation.args))
+        finally:
+            invocation.timings["parse"] = _leave("parse", path, begin) if observed \
+                else _time.perf_counter() - begin
+
+        if hasattr(invocation.args, _OUTPUT_DEST):
+            invocation.output = getattr(invocation.args, _OUTPUT_DEST)
+            delattr(invocation.args, _OUTPUT_DEST)
+
+        # sub-commands are looked up by name, since a mounted command may have several parents.
+        nodes = [*self.__ancestors(), self]
+        # a command line parsed elsewhere holds the dests of the whole path.
+        begin = len(nodes) - 1 if parsed == None else 0
+        for name in invocation._chain:
+            nodes.append(nodes[-1].__resolved()._subcommands[name])
+        nodes[-1].__resolved()
+        if values != None and all(x.__isCacheable() for x in nodes):
+            self._parse_cache.put(key, values, invocation._chain)
+        invocation._chain = None
+        invocation.path = tuple(x._name for x in nodes)
+
+        if nodes[-1]._slots and namespace == None:
+            invocation.args = nodes[-1].__slotted(nodes[begin:], invocation.args)
+
+        # parent commands are skipped if they are skippable, unless they provide resources.
+        return [(invocation.path[:i + 1], x) for i, x in enumerate(nodes)
+                if x is nodes[-1] or not x._skip_if_has_subcmd or x._scope != None]
+
+    def __run(self, handlers: list, invocation: Invocation) -> Any:
+        observed = _isObserved(invocation)
+        begin = _time.perf_counter()
+        try:
+            result = None
+            for i, (path, cmd) in enumerate(handlers):
+                if not observed and cmd._scope == None:
+                    result = cmd._fn(invocation.args)
+                    continue
+
+                phase = "leaf" if i + 1 == len(handlers) else "parent"
+                start = _enter(phase, path) if observed else None
+                try:
+                    if cmd._scope == None:
+                        result = cmd._fn(invocation.args)
+                    else:
+                        key, result = cmd.__lookupResource(invocation)
+                        if result is _MISSING:
+                            result = cmd.__storeResource(invocation, key, cmd._fn(invocation.args))
+                finally:
+                    if observed:
+                        _leave(phase, path, start)
+            return self.__output(result, invocation)
+        finally:
+            try:
+                if invocation._teardowns:
+                    _tearDown(invocation)
+            finally:
+                invocation.timings["run"] = _time.perf_counter() - begin
+
+    async def __arun(self, handlers: list, invocation: Invocation) -> Any:
+        observed = _isObserved(invocation)
+        begin = _time.perf_counter()
+        try:
+            result = None
+            for i, (path, cmd) in enumerate(handlers):
+                phase = "leaf" if i + 1 == len(handlers) else "parent"
+                start = _enter(phase, path) if observed else None
+                try:
+                    key = None
+                    if cmd._scope != None:
+                        key, result = cmd.__lookupResource(invocation)
+                    if cmd._scope == None or result is _MISSING:
+                        result = cmd._fn(invocation.args)
+                        if _isAsync(cmd._fn):
+                            result = await result
+                        if cmd._scope != None:
+                            result = cmd.__storeResource(invocation, key, result)
+                finally:
+                    if observed:
+                        _leave(phase, path, start)
+            return self.__output(result, invocation)
+        finally:
+            try:
+                if invocation._teardowns:
+                    _tearDown(invocation)
+            finally:
+                invocation.timings["run"] = _time.perf_counter() - begin
+
+    def __lookupResource(self, invocation: Invocation) -> tuple:
+        key = None
+        if self._scope != "invocation":
+            try:
+                key = tuple(getattr(invocation.args, x.dest, None) for x in self._getParser()._actions
+                            if x.dest is not _SUPPRESS)
+                hash(key)
+            except TypeError:
+                # arguments which are not hashable can not be looked up, like a per-invocation scope.
+                key = None
+        if key == None:
+            return None, _MISSING
+
+        with _RESOURCE_LOCK:
+            expired = self.__sweepResources()
+            entry = self._resources.get(key) if self._resources else None
+        self.__tearDownResources(expired)
+        if entry == None:
+            return key, _MISSING
+
+        if invocation.resources == None:
+            invocation.resources = {}
+        invocation.resources[self] = entry[0]
+        return key, entry[0]
+
+    def __storeResource(self, invocation: Invocation, key, value) -> Any:
+        if key == None:
+            if self._teardown != None:
+                if invocation._teardowns == None:
+                    invocation._teardowns = []
+                invocation._teardowns.append((self._teardown, value))
         else:
-            return self.__runImpl(_ARGS)
+            deadline = None if self._scope == "process" else _time.monotonic() + self._scope
+            with _RESOURCE_LOCK:
+                expired = self.__sweepResources()
+                if self._resources == None:
+                    if not _RESOURCE_OWNERS:
+                        import atexit
+                        atexit.register(_releaseResources)
+                    self._resources = {}
+                    _RESOURCE_OWNERS.append(self)
+                entry = self._resources.setdefault(key, (value, deadline))
+            self.__tearDownResources(expired)
+            if entry[0] is not value:
+                # another thread provided the resource first.
+                if self._teardown != None:
+                    self._teardown(value)
+                value = entry[0]
+
+        if invocation.resources == None:
+            invocation.resources = {}
+        invocation.resources[self] = value
+        return value
+
+    def __sweepResources(self) -> list:
+        # each resource of a command is kept equally long, so the entries are in the order of their deadlines.
+        expired = []
+        now = _time.monotonic()
+        while self._resources:
+            key, (value, deadline) = next(iter(self._resources.items()))
+            if deadline == None or deadline > now:
+                break
+            del self._resources[key]
+            expired.append(value)
+        return expired
+
+    def __tearDownResources(self, values: list) -> None:
+        # resources are torn down outside of |_RESOURCE_LOCK|, since a teardown may take long.
+        if self._teardown != None:
+            for value in values:
+                self._teardown(value)
+
+    def releaseResources(self) -> None:
+        """Tear down the resources of this command cached across invocations."""
+
+        with _RESOURCE_LOCK:
+            entries = list(self._resources.values()) if self._resources else []
+            if self._resources:
+                self._resources.clear()
+        if self._teardown != None:
+            for value, _ in entries:
+                self._teardown(value)
+
+    def __output(self, result, invocation: Invocation) -> Any:
+        if invocation._pipe != None:
+            invocation._pipe.feed(result)
+            return None
+        if invocation.output == None or not isinstance(result, _GeneratorType):
+            return result
+        _writeRecords(result, invocation.output, _sys.stdout)
+        return None
+
+    def __runPipeline(self, argv: list) -> Any:
+        stages = [[]]
+        for token in argv:
+            if token == self._pipeline:
+                stages.append([])
+            else:
+                stages[-1].append(token)
+
+        begun = []
+        try:
+            # every stage is parsed up front, so that an invalid command line fails before any stage runs.
+            parsed = []
+            for stage in stages:
+                invocation, stage = self.__begin(stage)
+                begun.append(invocation)
+                parsed.append((invocation, self.__parse(invocation, stage, None)))
+
+            import threading
+
+            def run(invocation: Invocation, handlers: list) -> Any:
+                _INVOCATION.set(invocation)
+                if any(_isAsync(x._fn) for _, x in handlers):
+                    import asyncio
+                    return asyncio.run(self.__arun(handlers, invocation))
+                return self.__run(handlers, invocation)
+
+            def runStage(invocation: Invocation, handlers: list, upstream: _Pipe) -> None:
+                try:
+                    if upstream != None:
+                        invocation.input = upstream.receive()
+                    run(invocation, handlers)
+                except BaseException as e:
+                    invocation._pipe.fail(e)
+                finally:
+                    if upstream != None:
+                        upstream.close()
+
+            threads = []
+            upstream = None
+            for invocation, handlers in parsed[:-1]:
+                invocation._pipe = _Pipe()
+                # the stages see the context variables of the caller, e.g. captured streams in tests.
+                threads.append(threading.Thread(target=_copy_context().run,
+                                                args=(runStage, invocation, handlers, upstream),
+                                                name=f"dcli-pipeline-{len(threads)}", daemon=True))
+                upstream = invocation._pipe
+            for thread in threads:
+                thread.start()
+
+            # the last stage runs in this thread and its result is the result of the pipeline.
+            invocation, handlers = parsed[-1]
+            try:
+                invocation.input = upstream.receive()
+                return run(invocation, handlers)
+            finally:
+                upstream.close()
+                for thread in threads:
+                    thread.join()
+                for invocation, _ in parsed:
+                    if invocation.profile in _PROFILE_MODES:
+                        self.__report(invocation)
+        finally:
+            # in order, so that the last stage stays readable once the pipeline returns.
+            for invocation in begun:
+                self.__end(invocation)
+
+    def cacheParses(self, maxsize: int = 256):
+        """Reuse the parses of the latest |maxsize| distinct command lines of this command.
+
+        A repeated command line gets its arguments from the cache instead of parsing them again, and each invocation
+        gets its own copies of the mutable values, e.g. lists. Command lines of commands declared with
+        |cacheable=False|, or with arguments read lazily or from files, are never cached. Any change of a parser
+        clears the cache.
+        """
+
+        assert isinstance(maxsize, int) and maxsize > 0, \
+            f"invalid size of the parse cache of command |{self._name}|: {maxsize}"
+
+        self._parse_cache = _ParseCache(maxsize)
+        return self
+
+    def parseCacheInfo(self) -> dict:
+        """Return the "hits", "misses", "maxsize" and current "size" of the parse cache, see |cacheParses()|."""
+
+        if self._parse_cache == None:
+            return {"hits": 0, "misses": 0, "maxsize": 0, "size": 0}
+        return self._parse_cache.info()
+
+    def __isCacheable(self) -> bool:
+        if not self._cacheable:
+            return False
+        parser = self._getParser()
+        # files and streams are read anew by each invocation.
+        return parser.fromfile_prefix_chars == None and \
+            not any(isinstance(x, _StreamAction) or isinstance(x.type, _FileType) for x in parser._actions)
+
+    def __dispatch(self, argv: list) -> _Namespace:
+        plan = _planDispatch(self, argv, 0)
+        if plan == None:
+            return None
+        try:
+            return _runDispatch(plan, _Namespace())
+        except _ArgumentError:
+            # let argparse report the error.
+            return None
+
+    def compile(self):
+        """Resolve command lines of this command with precomputed tables of each command instead of argparse.
+
+        The tables map option strings and sub-command names to their actions in a single pass over the command line,
+        and produce the same namespace as argparse. Anything else, e.g. abbreviations, files of arguments, "--",
+        arguments taking several values and invalid command lines, falls back to argparse.
+        """
 
-    def __runImpl(self, args: _Namespace) -> Any:
+        self._compiled = True
+        return self
+
+    def _dispatchTable(self) -> _DispatchTable:
+        if self._table == None:
+            self._table = _DispatchTable(self._getParser())
+        return self._table
+
+    def __path(self) -> tuple:
+        if self._parent_cmd and isinstance(self._parent_cmd, _CommandWrapper):
+            return (*self._parent_cmd.__path(), self._name)
+        return (self._name,)
+
+    def __slotted(self, parsed: list, args: _Namespace):
+        if self._namespaces == None:
+            self._namespaces = {}
+        key = tuple(id(x) for x in parsed)
+        if key not in self._namespaces:
+            self._namespaces[key] = _namespaceClass(parsed)
+
+        cls = self._namespaces[key]
+        if cls == None:
+            return args
+        result = cls()
+        try:
+            for dest, value in vars(args).items():
+                setattr(result, dest, value)
+        except AttributeError:
+            # dests set outside of the parsers stay in the argparse namespace.
+            return args
+        return result
+
+    def __ancestors(self) -> list:
         if self._parent_cmd and isinstance(self._parent_cmd, _CommandWrapper):
-            self._parent_cmd.__runImpl(args)
-        sub = self.__getSubCommand(args)
-        if not sub:
-            return self._fn(args)
-        elif not self._skip_if_has_subcmd or self == sub:
-            return self._fn(args)
+            return [*self._parent_cmd.__ancestors(), self._parent_cmd]
+        return []
+
+    def __runBatchFile(self, file: str) -> None:
+        stream = _sys.stdin if file == "-" else open(file, "r")
+        lines = ((n, x)
+                 for n, x in enumerate(stream, 1)
+                 if x.strip() and not x.lstrip().startswith("#"))
+        failures = 0
+        try:
+            for n, line in lines:
+                try:
+                    argv = _shlex.split(line)
+                except ValueError as e:
+                    # a line which can not be split fails like a usage error, and the batch goes on.
+                    result = BatchResult([line.strip()], 2, error=UsageError(str(e), self._name))
+                else:
+                    result = next(self.runBatch([argv]))
+                if result.code != 0:
+                    failures += 1
+                    print(f"{self._name}: line {n}: exit {result.code}: {result.error}",
+                          file=_sys.stderr)
+        finally:
+            if stream is not _sys.stdin:
+                stream.close()
+
+        if failures:
+            raise SystemExit(1)
+
+    def runBatch(self, argvs: _Iterable[list]):
+        """Run command lines |argvs| one by one and yield a |BatchResult| for each of them.
+
+        A failing command line does not stop the batch: usage errors are reported as UsageError with code 2 without
+        printing the usage, |SystemExit| with its exit code and any other exception with code 1.
+        """
+
+        for argv in argvs:
+            token = _RAISE_USAGE_ERROR.set(True)
+            try:
+                result = BatchResult(argv, 0, self(argv))
+            except (UsageError, _ArgumentError) as e:
+                result = BatchResult(argv, 2, error=e)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else int(e.code != None)
+                result = BatchResult(argv, code, error=e if code else None)
+            except Exception as e:
+                result = BatchResult(argv, 1, error=e)
+            finally:
+                _RAISE_USAGE_ERROR.reset(token)
+            yield result
+
+    def __runChunk(self, chunk: list) -> list:
+        return list(self.runBatch(chunk))
+
+    def runParallel(self, argvs: _Iterable[list], *,
+                    executor: str = "thread",
+                    workers: int = None,
+                    chunksize: int = 1,
+                    ordered: bool = True,
+                    timeout: float = None):
+        """Run command lines |argvs| on a pool of workers and yield a |BatchResult| for each of them.
+
+        Process workers import this command by the "module:name" path of its function, so it must be defined at the
+        top level of a module, and each worker builds the command tree only once.
+
+        Keyword Arguments:
+            - argvs -- The command lines to run, consumed lazily
+            - executor -- Either "thread" for I/O-bound commands or "process" for CPU-bound commands
+            - workers -- The number of workers (default: the number of CPUs)
+            - chunksize -- The number of command lines sent to a worker at once
+            - ordered -- Yield results in the order of |argvs| instead of the order of completion
+            - timeout -- Seconds to wait for each command line once a worker runs it, after which it is reported as
+              TimeoutError. The worker itself can not be interrupted and keeps running in the background
+        """
+
+        from concurrent.futures import (
+            ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+        )
+        from itertools import islice
+
+        assert executor in ("thread", "process"), \
+            f"invalid executor |{executor}|."
+        assert chunksize >= 1, f"invalid chunksize |{chunksize}|."
+
+        workers = workers or _os.cpu_count() or 1
+        if executor == "thread":
+            pool = ThreadPoolExecutor(workers)
+            run = self.__runChunk
+        else:
+            pool = ProcessPoolExecutor(workers,
+                                       initializer=_initWorker,
+                                       initargs=(_reference(self._fn),))
+            run = _runChunk
+
+        argvs = iter(argvs)
+        pending = {}
+        expired = False
+
+        def fill():
+            # keep a bounded number of chunks in flight, so that |argvs| is streamed.
+            while len(pending) < workers * 2:
+                chunk = list(islice(argvs, chunksize))
+                if not chunk:
+                    return
+                pending[pool.submit(run, chunk)] = [chunk, None]
+
+        def deadline(future):
+            # the clock of a chunk starts once a worker runs it, not while it is queued.
+            entry = pending[future]
+            if entry[1] == None and (future.running() or future.done()):
+                entry[1] = _time.monotonic() + timeout * len(entry[0])
+            return entry[1]
+
+        def remaining(futures):
+            if timeout == None:
+                return None
+            now = _time.monotonic()
+            return min(_PARALLEL_POLL if deadline(x) == None else max(0, deadline(x) - now)
+                       for x in futures)
+
+        def isExpired(future):
+            return timeout != None and not future.done() and deadline(future) != None \
+                and deadline(future) <= _time.monotonic()
+
+        def collect(future):
+            chunk, _ = pending.pop(future)
+            if not future.done():
+                future.cancel()
+                return [BatchResult(x, 1, error=TimeoutError(f"timeout after {timeout} seconds."))
+                        for x in chunk]
+            try:
+                return future.result()
+            except Exception as e:
+                return [BatchResult(x, 1, error=e) for x in chunk]
+
+        try:
+            fill()
+            while pending:
+                if ordered:
+                    future = next(iter(pending))
+                    wait([future], remaining([future]))
+                    done = [future] if future.done() or isExpired(future) else []
+                else:
+                    finished, _ = wait(pending, remaining(pending), return_when=FIRST_COMPLETED)
+                    done = [x for x in pending if x in finished or isExpired(x)]
+                expired |= any(not x.done() for x in done)
+                for future in done:
+                    yield from collect(future)
+                fill()
+        finally:
+            pool.shutdown(wait=not expired, cancel_futures=True)
+
+    def memoryUsage(self) -> dict:
+        """Return the memory used by this command and all its sub-commands.
+
+        The result holds the number of commands in "nodes", the number of built parsers in "parsers", and the deep
+        size of the commands with their argument specs, help caches and parsers in "bytes". Objects shared by several
+        commands, e.g. mounted commands and equal argument specs, are counted once.
+        """
+
+        seen = set()
+        visited = set()
+        usage = {"nodes": 0, "parsers": 0, "bytes": 0}
+        stack = [self]
+        while stack:
+            cmd = stack.pop()
+            if id(cmd) in visited:
+                continue
+            visited.add(id(cmd))
+            usage["nodes"] += 1
+            usage["parsers"] += cmd._parser != None
+            usage["bytes"] += _sizeof(cmd, seen)
+            stack.extend(cmd._subcommands.values())
+        return usage
+
+    def __registerSubCommand(self, cmd, parser: _ArgumentParser = None) -> None:
+        if self._subparsers == None:
+            self._subparsers = (parser or self._parser).add_subparsers(
+                action=_SubCommandsAction)
+        self._subparsers.required = self._required_sub
+        self._table = None
+        # a deferred sub-command is never built before it is invoked.
+        self._subparsers.addCommand(cmd,
+                                    lazy=self._lazy or cmd._target != None)
+
+    def __resolve(self) -> None:
+        if self._target == None:
+            return
+
+        obj = _importReference(self._target)
+        if isinstance(obj, _CommandWrapper):
+            obj.__resolve()
+            self._fn = obj._fn
+            self._args = obj._args
+            self._kwargs = {**obj._kwargs, "prog": self._name}
+            self._required_sub = obj._required_sub
+            self._skip_if_has_subcmd = obj._skip_if_has_subcmd
+            self._slots = self._slots or obj._slots
+            self._scope = obj._scope
+            self._teardown = obj._teardown
+            self._cacheable = obj._cacheable
+            for cmd in obj._subcommands.values():
+                self.mountSubCommand(cmd)
+        else:
+            assert callable(obj), \
+                f"invalid target for command |{self._name}|."
+            self._fn = obj
+        # cleared last, since a resolved command is read without the lock.
+        self._target = None
+
+    def __resolved(self):
+        # a command line parsed elsewhere, e.g. by a generated dispatcher, reaches deferred commands unresolved.
+        if self._target != None:
+            with _BUILD_LOCK:
+                self.__resolve()
+        return self
 
     def _addSubCommand(self, *,
                        name: str,
@@ -101,52 +1872,169 @@ class _CommandWrapper:
                        help,
                        skippable,
                        args,
-                       **kwargs) -> _ArgumentParser:
+                       lazy=False,
+                       slots=False,
+                       scope=None,
+                       teardown=None,
+                       cacheable=True,
+                       **kwargs):
         assert name not in self._subcommands, \
             f"add sub-command with duplicate name |{name}|."
-        if self._subparsers == None:
-            self._subparsers = self._getParser().add_subparsers()
-        self._subparsers.required = self._required_sub
 
         result = _CommandWrapper(name,
                                  func,
-                                 self._subparsers.add_parser(name,
-                                                             help=help,
-                                                             **kwargs),
+                                 None,
                                  parent=self,
                                  required_subcmd=need_sub,
                                  skip_if_has_subcmd=skippable,
                                  help=help,
                                  args=args,
-                                 kwargs=kwargs)
-
-        result._getParser().set_defaults(**{_SUBCMD_SPECIFIER: result})
+                                 kwargs=kwargs,
+                                 lazy=lazy or self._lazy,
+                                 slots=slots or self._slots,
+                                 scope=scope,
+                                 teardown=teardown,
+                                 cacheable=cacheable)
 
-        for arg in args:
-            if isinstance(arg, _ArgumentWrapper):
-                result._getParser().add_argument(*arg.args, **arg.kwargs)
+        with _BUILD_LOCK:
+            self._subcommands[name] = result
+            if self._help_cache:
+                self._help_cache.clear()
 
-        self._subcommands[name] = result
+            # a parser not built yet registers its sub-commands once it is built.
+            if self._parser != None:
+                self.__registerSubCommand(result)
 
         return result
 
     def _getParser(self) -> _ArgumentParser:
+        parser = self._parser
+        if parser != None:
+            return parser
+
+        with _BUILD_LOCK:
+            # another thread may have built the parser while this one was waiting.
+            if self._parser == None:
+                if _isObserved(_INVOCATION.get()):
+                    path = self.__path()
+                    begin = _enter("build", path)
+                    try:
+                        self.__build()
+                    finally:
+                        _leave("build", path, begin)
+                else:
+                    self.__build()
+
         return self._parser
 
+    def __build(self) -> None:
+        self.__resolve()
+        parser = _Parser(**self._kwargs)
+
+        for arg in self._args:
+            if isinstance(arg, _ArgumentWrapper):
+                parser.add_argument(*arg.args, **arg.kwargs)
+
+        for cmd in self._subcommands.values():
+            self.__registerSubCommand(cmd, parser)
+
+        if self._help_cache == None:
+            self._help_cache = {}
+        parser._help_cache = self._help_cache
+        # other threads read the parser without the lock, so it is published only once it is complete.
+        self._parser = parser
+
     def _addArgument(self, arg: _ArgumentWrapper):
-        self._getParser().add_argument(*arg.args, **arg.kwargs)
+        with _BUILD_LOCK:
+            self._args = (*self._args, arg)
+            if self._help_cache:
+                self._help_cache.clear()
+            if self._parser != None:
+                self._parser.add_argument(*arg.args, **arg.kwargs)
+                self._table = None
 
     def addSubCommand(self, cmd):
         assert isinstance(cmd, _CommandWrapper), \
             f"add invalid sub-command |{cmd}|."
 
-        self._addSubCommand(name=cmd._name,
-                            func=cmd._fn,
-                            need_sub=cmd._required_sub,
-                            help=cmd._brief_help,
-                            skippable=cmd._skip_if_has_subcmd,
-                            args=cmd._args,
-                            **cmd._kwargs)
+        if cmd._target != None:
+            return self.addDeferredSubCommand(cmd._name,
+                                              cmd._target,
+                                              help=cmd._brief_help)
+
+        result = self._addSubCommand(name=cmd._name,
+                                     func=cmd._fn,
+                                     need_sub=cmd._required_sub,
+                                     help=cmd._brief_help,
+                                     skippable=cmd._skip_if_has_subcmd,
+                                     args=cmd._args,
+                                     lazy=cmd._lazy,
+                                     slots=cmd._slots,
+                                     scope=cmd._scope,
+                                     teardown=cmd._teardown,
+                                     cacheable=cmd._cacheable,
+                                     **cmd._kwargs)
+        for sub in cmd._subcommands.values():
+            result.addSubCommand(sub)
+        return result
+
+    def mountSubCommand(self, cmd):
+        """Mount command |cmd| with all its sub-commands under this command, without rebuilding them.
+
+        Unlike |addSubCommand()|, which copies |cmd| into a new sub-command, the parsers of the mounted commands are
+        shared, so that the same command tree can be mounted under several parents, e.g. a plugin built on its own.
+        """
+
+        assert isinstance(cmd, _CommandWrapper), \
+            f"mount invalid sub-command |{cmd}|."
+        assert cmd._name not in self._subcommands, \
+            f"add sub-command with duplicate name |{cmd._name}|."
+
+        with _BUILD_LOCK:
+            self._subcommands[cmd._name] = cmd
+            if self._help_cache:
+                self._help_cache.clear()
+
+            if self._parser != None:
+                self.__registerSubCommand(cmd)
+
+        return cmd
+
+    def addDeferredSubCommand(self, name: str, target: str, *, help: str = ""):
+        """Add a sub-command whose module is imported only when it is invoked.
+
+        Keyword Arguments:
+            - name -- The name of the sub-command
+            - target -- The "module:function" path of the sub-command, either a plain function or a |dcli.command|
+            - help -- The short help message for sub-command, listed without importing |target|
+        """
+
+        assert isinstance(name, str), \
+            f"invalid name for command: {name}"
+        assert isinstance(target, str) and ":" in target, \
+            f"invalid target for command |{name}|: {target}"
+        assert name not in self._subcommands, \
+            f"add sub-command with duplicate name |{name}|."
+
+        result = _CommandWrapper(name,
+                                 None,
+                                 None,
+                                 parent=self,
+                                 help=help,
+                                 kwargs={"prog": name},
+                                 lazy=self._lazy,
+                                 slots=self._slots,
+                                 target=target)
+
+        with _BUILD_LOCK:
+            self._subcommands[name] = result
+            if self._help_cache:
+                self._help_cache.clear()
+
+            if self._parser != None:
+                self.__registerSubCommand(result)
+
+        return result
 
 
 def arg(*name_or_flags: str,
@@ -159,7 +2047,10 @@ def arg(*name_or_flags: str,
         required=None,
         help=None,
         metavar=None,
-        dest=None):
+        dest=None,
+        stream=False,
+        mmap=False,
+        array=None):
     """Wrapper for add_argument.
 
     Keyword Arguments:
@@ -174,11 +2065,35 @@ def arg(*name_or_flags: str,
         - help -- Help message for an argument
         - metavar -- Alternate display name for the argument as shown in help
         - dest -- Specify the attribute name used in the result namespace
+        - stream -- Pass the values (nargs="*" by default) as a lazy iterator, where "@path" and "-" stand for the lines
+                    of a file and of stdin, and |type| is applied while iterating
+        - mmap -- Read the files of a |stream| argument through a memory map
+        - array -- Convert the values (nargs="+" by default) in bulk into an array.array of this typecode, e.g. "l" or
+                   "d", instead of a list
 
     See https://docs.python.org/3/library/argparse.html#the-add-argument-method for more information.
     """
 
+    assert not stream or action == None, \
+        f"stream arguments can not have an action |{action}|."
+    assert not mmap or stream, \
+        "mmap is only available for stream arguments."
+    assert array == None or (isinstance(array, str) and len(array) == 1 and array in "bBhHiIlLqQfd"), \
+        f"invalid typecode for array argument |{array}|."
+    assert array == None or (action == None and type == None and not stream), \
+        "array arguments can not have an action, a type or stream."
+
     kwarg = {}
+    if array != None:
+        kwarg["action"] = _ArrayAction
+        kwarg["typecode"] = array
+    if stream:
+        kwarg["action"] = _StreamAction
+        if type != None:
+            kwarg["stream_type"] = type
+            type = None
+        if mmap:
+            kwarg["mmap"] = mmap
     if action != None:
         kwarg["action"] = action
     if nargs != None:
@@ -200,7 +2115,7 @@ def arg(*name_or_flags: str,
     if dest != None:
         kwarg["dest"] = dest
 
-    return _ArgumentWrapper(*name_or_flags, **kwarg)
+    return _internArgument(name_or_flags, kwarg)
 
 
 def command(name: str,
@@ -220,7 +2135,15 @@ def command(name: str,
             conflict_handler='error',
             add_help=True,
             allow_abbrev=True,
-            exit_on_error=True):
+            exit_on_error=True,
+            lazy=False,
+            slots=False,
+            scope=None,
+            teardown=None,
+            output=False,
+            profile=False,
+            pipeline=None,
+            cacheable=True):
     """Decorator for parsing command line strings and running if necessary.
 
     Keyword Arguments:
@@ -242,6 +2165,23 @@ def command(name: str,
         - add_help -- Add a -h/-help option
         - allow_abbrev -- Allow long options to be abbreviated unambiguously
         - exit_on_error -- Determines whether or not ArgumentParser exits with error info when an error occurs
+        - lazy -- Build the parsers of sub-commands only when they are invoked, inherited by sub-commands
+        - slots -- Pass the arguments as an instance of a class generated with __slots__ for the dests of the parsed
+                   commands instead of argparse.Namespace, inherited by sub-commands
+        - scope -- Cache the return value of the function as a resource for sub-commands, see |dcli.resource()|, either
+                   "invocation", "process" or the seconds to keep it; later invocations with the same arguments of this
+                   command reuse a cached resource instead of calling the function, which is never skipped
+        - teardown -- The function to release a resource, called at the end of the invocation, on expiry, or at exit
+        - output -- Add the option --output-format {text,jsonl,csv} to the root command, and write each item yielded
+                    by a generator function of the invoked command into stdout in that format
+        - profile -- Add the option --dcli-profile[=json|cprofile] to the root command, anywhere before "--" in the
+                     command line, which reports the seconds spent in each phase as a JSON line, or the cProfile
+                     statistics, into stderr
+        - pipeline -- The token separating the stages of a pipeline in the command line of the root command; each
+                      stage is a command line of its own, and gets the return value of the previous stage, or an
+                      iterator over the items it yields, as |dcli.invocation().input|
+        - cacheable -- Whether the parses of command lines invoking this command may be reused, see |cacheParses()|;
+                       disable it for arguments whose |type| gives a different value for the same string
 
     See https://docs.python.org/3/library/argparse.html#argparse.ArgumentParser for more information.
     """
@@ -254,9 +2194,35 @@ def command(name: str,
         f"invalid arguments for command |{name}|."
     assert all(isinstance(x, _CommandWrapper) for x in parents), \
         f"invalid parents for command |{name}|."
+    assert not profile or parent == None, \
+        f"profile is only available for the root command, not |{name}|."
+    assert not output or parent == None, \
+        f"output is only available for the root command, not |{name}|."
+    assert pipeline == None or (parent == None and isinstance(pipeline, str) and pipeline), \
+        f"invalid pipeline for command |{name}|: {pipeline}"
+    assert scope in (None, "invocation", "process") or \
+        (isinstance(scope, (int, float)) and not isinstance(scope, bool) and scope > 0), \
+        f"invalid scope for command |{name}|: {scope}"
+    assert teardown == None or (scope != None and callable(teardown)), \
+        f"invalid teardown for command |{name}|."
 
     parents = [x._getParser() for x in parents]
 
+    if output:
+        args = (*args, _internArgument((_OUTPUT_SPECIFIER,),
+                                       {"dest": _OUTPUT_DEST,
+                                        "choices": _OUTPUT_FORMATS,
+                                        "default": _OUTPUT_FORMATS[0],
+                                        "help": "format of the records written into stdout (default: text)"}))
+    if profile:
+        args = (*args, _internArgument((_PROFILE_SPECIFIER,),
+                                       {"action": _ProfileAction,
+                                        "dest": _SUPPRESS,
+                                        "default": _SUPPRESS,
+                                        "help": "report the time spent in each phase into stderr, or the cProfile "
+                                                "statistics with --dcli-profile=cprofile"}))
+
+    # only options other than the defaults of ArgumentParser are kept.
     parser_kwargs = {}
     parser_kwargs["prog"] = name
     parser_kwargs["usage"] = usage
@@ -270,6 +2236,8 @@ def command(name: str,
     parser_kwargs["add_help"] = add_help
     parser_kwargs["allow_abbrev"] = allow_abbrev
     parser_kwargs["exit_on_error"] = exit_on_error
+    parser_kwargs = {k: v for k, v in parser_kwargs.items()
+                     if k not in _PARSER_DEFAULTS or v != _PARSER_DEFAULTS[k]}
 
     def deorator(func):
         nonlocal name
@@ -279,25 +2247,35 @@ def command(name: str,
         nonlocal need_sub
         nonlocal skippable
         nonlocal parser_kwargs
+        nonlocal lazy
+        nonlocal slots
+        nonlocal scope
+        nonlocal teardown
+        nonlocal pipeline
+        nonlocal cacheable
 
         cmd_wrapper: _CommandWrapper = None
 
         if parent == None:
             # root command condition.
-            raw_parser = _ArgumentParser(**parser_kwargs)
-
             cmd_wrapper = _CommandWrapper(name,
                                           func,
-                                          raw_parser,
+                                          None,
                                           parent=None,
                                           required_subcmd=need_sub,
                                           skip_if_has_subcmd=skippable,
                                           help=help,
                                           args=args,
-                                          kwargs=parser_kwargs)
-            # add arguments
-            for arg in args:
-                cmd_wrapper._addArgument(arg)
+                                          kwargs=parser_kwargs,
+                                          lazy=lazy,
+                                          slots=slots,
+                                          scope=scope,
+                                          teardown=teardown,
+                                          pipeline=pipeline,
+                                          cacheable=cacheable)
+            # a lazy root builds its parser on first invocation.
+            if not lazy:
+                cmd_wrapper._getParser()
 
         else:
             # sub command condition.
@@ -309,9 +2287,156 @@ def command(name: str,
                                                 skippable=skippable,
                                                 help=help,
                                                 args=args,
+                                                lazy=lazy,
+                                                slots=slots,
+                                                scope=scope,
+                                                teardown=teardown,
+                                                cacheable=cacheable,
                                                 **parser_kwargs)
 
         assert cmd_wrapper != None, "something went wrong!"
         return cmd_wrapper
 
     return deorator
+
+
+def _initWorker(reference: str) -> None:
+    global _WORKER_COMMAND
+    _WORKER_COMMAND = _importReference(reference)
+
+
+def _runChunk(chunk: list) -> list:
+    return list(_WORKER_COMMAND.runBatch(chunk))
+
+
+def _reference(fn) -> str:
+    if isinstance(fn, _LazyFunction):
+        return fn.reference
+
+    module = _sys.modules.get(getattr(fn, "__module__", None))
+    qualname = getattr(fn, "__qualname__", "")
+    obj = module
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr, None)
+    if isinstance(obj, _CommandWrapper):
+        obj = obj._fn
+    if module == None or obj is not fn:
+        raise ValueError(f"function |{qualname}| is not importable.")
+    return f"{fn.__module__}:{qualname}"
+
+
+def _dumpCommand(cmd: _CommandWrapper, sources: dict, render_help: bool) -> dict:
+    # rendering the help of a deferred command would import it.
+    if render_help and cmd._target == None:
+        parser = cmd._getParser()
+        parser.format_help()
+        parser.format_usage()
+
+    fn = None
+    if cmd._fn != None:
+        fn = _reference(cmd._fn)
+        module = _sys.modules[fn.partition(":")[0]]
+        if getattr(module, "__file__", None):
+            stat = _os.stat(module.__file__)
+            sources[module.__file__] = (stat.st_mtime_ns, stat.st_size)
+
+    return {
+        "name": cmd._name,
+        "fn": fn,
+        "target": cmd._target,
+        "help": cmd._brief_help,
+        "need_sub": cmd._required_sub,
+        "skippable": cmd._skip_if_has_subcmd,
+        "slots": cmd._slots,
+        "scope": cmd._scope,
+        "teardown": _reference(cmd._teardown) if cmd._teardown != None else None,
+        "pipeline": cmd._pipeline,
+        "cacheable": cmd._cacheable,
+        "args": [(x.args, x.kwargs) for x in cmd._args
+                 if isinstance(x, _ArgumentWrapper)],
+        "kwargs": cmd._kwargs,
+        "help_cache": dict(cmd._help_cache or {}),
+        "subcommands": [_dumpCommand(x, sources, render_help)
+                        for x in cmd._subcommands.values()],
+    }
+
+
+def _loadCommand(node: dict, parent: _CommandWrapper) -> _CommandWrapper:
+    cmd = _CommandWrapper(node["name"],
+                          _LazyFunction(node["fn"]) if node["fn"] else None,
+                          None,
+                          parent=parent,
+                          required_subcmd=node["need_sub"],
+                          skip_if_has_subcmd=node["skippable"],
+                          help=node["help"],
+                          args=tuple(_internArgument(args, kwargs)
+                                     for args, kwargs in node["args"]),
+                          kwargs=node["kwargs"],
+                          lazy=True,
+                          slots=node["slots"],
+                          scope=node["scope"],
+                          teardown=_LazyFunction(node["teardown"]) if node["teardown"] else None,
+                          pipeline=node["pipeline"],
+                          cacheable=node["cacheable"],
+                          target=node["target"])
+    if node["help_cache"]:
+        cmd._help_cache = dict(node["help_cache"])
+    for child in node["subcommands"]:
+        cmd._subcommands[child["name"]] = _loadCommand(child, cmd)
+    return cmd
+
+
+def _isFresh(cache: dict, target: str) -> bool:
+    if cache["version"] != VERSION or cache["target"] != target:
+        return False
+    for file, (mtime, size) in cache["sources"].items():
+        stat = _os.stat(file)
+        if stat.st_mtime_ns != mtime or stat.st_size != size:
+            return False
+    return True
+
+
+def cachedCommand(target: str, path, *, render_help: bool = False) -> _CommandWrapper:
+    """Load the command tree of |target| from the cache file |path| instead of importing it.
+
+    The cache is rebuilt whenever the version of dcli or any source file of the commands changes. Commands loaded from
+    the cache are lazy, and the module of a command is imported only when its function is called.
+
+    Keyword Arguments:
+        - target -- The "module:name" path of the root command
+        - path -- The path of the cache file
+        - render_help -- Also save the help and usage of every command, rendered for the current terminal width
+    """
+
+    assert isinstance(target, str) and ":" in target, \
+        f"invalid target for command: {target}"
+
+    path = _Path(path).expanduser()
+    try:
+        with path.open("rb") as f:
+            cache = _pickle.load(f)
+        if _isFresh(cache, target):
+            return _loadCommand(cache["tree"], None)
+    except Exception:
+        # a missing, stale or unreadable cache is simply rebuilt.
+        pass
+
+    root = _importReference(target)
+    assert isinstance(root, _CommandWrapper), \
+        f"invalid target for command: {target}"
+
+    try:
+        sources = {}
+        tree = _dumpCommand(root, sources, render_help)
+        data = _pickle.dumps({"version": VERSION,
+                              "target": target,
+                              "sources": sources,
+                              "tree": tree})
+        tmp = path.with_name(f"{path.name}.{_os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        _os.replace(tmp, path)
+    except (ValueError, TypeError, AttributeError, OSError, _pickle.PicklingError):
+        # commands which can not be serialized are just not cached.
+        pass
+
+    return root
@@ -0,0 +1,156 @@
+"""In-process test runner for dcli commands.
+
+|invoke()| runs a command line of a command in the calling thread and returns its exit code, stdout, stderr, return
+value and parsed arguments, instead of exiting or writing into the real standard streams. Each invocation runs in a
+context of its own, so invocations in several threads at once neither see the output nor the |dcli.commandLine()| of
+each other.
+
+Usage:
+from dcli.testing import invoke
+
+def test_greet():
+  result = invoke(MyCommand, ["greet", "--name", "foo"])
+  assert result.code == 0
+  assert result.stdout == "hello foo\\n"
+"""
+
+import contextvars as _contextvars
+import io as _io
+import sys as _sys
+from typing import Any, NamedTuple as _NamedTuple
+from threading import Lock as _Lock
+
+# public symbols
+__all__ = ["Result", "invoke", "invokeMany"]
+
+# the captured streams of the current context, or None for the real ones.
+_STDIN = _contextvars.ContextVar("dcli_testing_stdin", default=None)
+_STDOUT = _contextvars.ContextVar("dcli_testing_stdout", default=None)
+_STDERR = _contextvars.ContextVar("dcli_testing_stderr", default=None)
+_INSTALL_LOCK = _Lock()
+
+
+class _StreamProxy:
+    """
+    Class _StreamProxy stands for a standard stream, and forwards to the stream captured in the current context, or
+    to the stream it replaced.
+    """
+
+    def __init__(self, stream, captured: _contextvars.ContextVar) -> None:
+        self._stream = stream
+        self._captured = captured
+
+    def _current(self):
+        stream = self._captured.get()
+        return stream if stream != None else self._stream
+
+    def write(self, text: str) -> int:
+        return self._current().write(text)
+
+    def flush(self) -> None:
+        self._current().flush()
+
+    def __iter__(self):
+        return iter(self._current())
+
+    def __getattr__(self, name: str):
+        return getattr(self._current(), name)
+
+
+def _install() -> None:
+    # a test framework may replace the standard streams between tests, so the proxies are checked on each call.
+    with _INSTALL_LOCK:
+        for name, captured in (("stdin", _STDIN), ("stdout", _STDOUT), ("stderr", _STDERR)):
+            stream = getattr(_sys, name)
+            if not isinstance(stream, _StreamProxy):
+                setattr(_sys, name, _StreamProxy(stream, captured))
+
+
+class Result(_NamedTuple):
+    """
+    Class Result is the outcome of a single command line in |invoke()|.
+
+    Attributes:
+        - argv -- The command line
+        - code -- The exit code, i.e. 0 on success, 2 for usage errors and 1 for exceptions
+        - stdout -- The text written into stdout
+        - stderr -- The text written into stderr
+        - value -- The return value of the command
+        - args -- The parsed arguments, i.e. |dcli.commandLine()|, or None if the command line was not parsed
+        - path -- The names of the invoked commands, from the root command to the sub-command
+        - error -- The |SystemExit| of a non-zero exit code or the exception raised by the command, if any
+    """
+
+    argv: list
+    code: int
+    stdout: str
+    stderr: str
+    value: Any = None
+    args: Any = None
+    path: tuple = ()
+    error: BaseException = None
+
+
+def _invoke(cmd, argv: list, stdin: str) -> Result:
+    from .dcli import invocation
+
+    stdout = _io.StringIO()
+    stderr = _io.StringIO()
+    _STDIN.set(_io.StringIO(stdin or ""))
+    _STDOUT.set(stdout)
+    _STDERR.set(stderr)
+
+    value = error = None
+    code = 0
+    try:
+        value = cmd(argv)
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            code = e.code
+        elif e.code != None:
+            print(e.code, file=stderr)
+            code = 1
+        error = e if code else None
+    except Exception as e:
+        code = 1
+        error = e
+
+    current = invocation()
+    return Result(list(argv), code, stdout.getvalue(), stderr.getvalue(), value,
+                  current.args if current != None else None,
+                  current.path if current != None else (), error)
+
+
+def invoke(cmd, argv: list, *, stdin: str = None) -> Result:
+    """Run command line |argv| of command |cmd| in the calling thread and return its |Result|.
+
+    The output of the command and of argparse, e.g. help and usage errors, is captured instead of written into the
+    standard streams, including the output of "async def" commands, but not of threads started by the command.
+
+    Keyword Arguments:
+        - cmd -- The command to invoke, usually the root command
+        - argv -- The command line arguments, without the program name
+        - stdin -- The text read from stdin (default: empty)
+    """
+
+    assert isinstance(argv, (list, tuple)), \
+        f"invalid command line for command |{cmd}|: {argv}"
+
+    _install()
+    # a fresh context isolates the captured streams and |dcli.invocation()| of each invocation.
+    return _contextvars.Context().run(_invoke, cmd, list(argv), stdin)
+
+
+def invokeMany(cmd, argvs: list, *, max_workers: int = None) -> list:
+    """Run command lines |argvs| of command |cmd| on a pool of threads and return their |Result| in order.
+
+    Keyword Arguments:
+        - cmd -- The command to invoke, usually the root command
+        - argvs -- The command lines, without the program name
+        - max_workers -- The number of threads (default: as concurrent.futures.ThreadPoolExecutor)
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda argv: invoke(cmd, argv), argvs))
@@ -4,4 +4,28 @@ import unittest
 if __name__ == "__main__":
     from test_argument import *
     from test_command import *
+    from test_lazy import *
+    from test_deferred import *
+    from test_cache import *
+    from test_completion import *
+    from test_daemon import *
+    from test_batch import *
+    from test_parallel import *
+    from test_async import *
+    from test_invocation import *
+    from test_dispatch import *
+    from test_hooks import *
+    from test_help import *
+    from test_mount import *
+    from test_memory import *
+    from test_slots import *
+    from test_output import *
+    from test_stream import *
+    from test_array import *
+    from test_resource import *
+    from test_suggest import *
+    from test_pipeline import *
+    from test_parse_cache import *
+    from test_testing import *
+    from test_codegen import *
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import io
+import array
+import pathlib
+import tempfile
+import contextlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+class TestArray(unittest.TestCase):
+
+    def testConvert(self):
+        @dcli.command("root", dcli.arg("ids", array="q"),
+                      dcli.arg("--weights", array="d", nargs="*"),
+                      dcli.arg("--bias", array="f", nargs=None))
+        def root(ns):
+            return ns
+
+        ns = root(["1", "-2", "3", "--weights", "0.5", "1e3", "--bias", "2"])
+        self.assertEqual(ns.ids, array.array("q", [1, -2, 3]))
+        self.assertEqual(ns.weights, array.array("d", [0.5, 1000.0]))
+        self.assertEqual(ns.bias, array.array("f", [2.0]))
+        self.assertEqual(memoryview(ns.ids).format, "q")
+
+        ns = root(["7"])
+        self.assertEqual((ns.weights, ns.bias), (None, None))
+
+    def testOptional(self):
+        @dcli.command("root", dcli.arg("--ids", array="l", nargs="?"),
+                      dcli.arg("--mask", array="B", nargs="?", const=array.array("B", [1])),
+                      dcli.arg("rest", array="l", nargs="?", default="5"))
+        def root(ns):
+            return ns
+
+        ns = root(["--ids", "--mask"])
+        self.assertEqual((ns.ids, ns.mask, ns.rest), (None, array.array("B", [1]), array.array("l", [5])))
+        ns = root(["--ids", "3", "--mask", "2", "4"])
+        self.assertEqual((ns.ids, ns.mask, ns.rest), (array.array("l", [3]), array.array("B", [2]),
+                                                      array.array("l", [4])))
+
+    def testFromFile(self):
+        @dcli.command("root", dcli.arg("ids", array="l"), fromfile_prefix_chars="@")
+        def root(ns):
+            return ns.ids
+
+        with tempfile.TemporaryDirectory() as dir:
+            path = pathlib.Path(dir, "ids.txt")
+            path.write_text("".join(f"{x}\n" for x in range(1000)))
+            self.assertEqual(root([f"@{path}"]), array.array("l", range(1000)))
+
+    def testErrors(self):
+        @dcli.command("root", dcli.arg("ids", array="B"))
+        def root(ns):
+            return ns.ids
+
+        for argv, message in ((["1", "x"], "invalid 'B' value at index 1: 'x'"),
+                              (["1", "2", "256"], "invalid 'B' value at index 2: '256'"),
+                              (["-1"], "invalid 'B' value at index 0: '-1'")):
+            with self.subTest(argv=argv):
+                stderr = io.StringIO()
+                with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+                    root(["--", *argv])
+                self.assertIn(message, stderr.getvalue())
+
+    def testInvalidTypecode(self):
+        with self.assertRaises(AssertionError):
+            dcli.arg("ids", array="u")
+        with self.assertRaises(AssertionError):
+            dcli.arg("ids", array="l", type=int)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import asyncio
+import functools
+import warnings
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+class TestAsyncCommand(unittest.TestCase):
+
+    def setUp(self):
+        self._events = []
+
+        @dcli.command("tool", skippable=False)
+        async def tool(_):
+            await asyncio.sleep(0)
+            self._events.append("tool")
+
+        @dcli.command("sync", parent=tool)
+        def sync(_):
+            self._events.append("sync")
+            return "sync"
+
+        @dcli.command(
+            "wait",
+            dcli.arg("seconds", type=float),
+            parent=tool
+        )
+        async def wait(ns):
+            await asyncio.sleep(getattr(ns, "seconds"))
+            self._events.append("wait")
+            return getattr(ns, "seconds")
+
+        self._tool = tool
+
+    def testCall(self):
+        self.assertEqual(self._tool(["wait", "0"]), 0.0)
+        self.assertEqual(self._events, ["tool", "wait"])
+
+        self._events.clear()
+        self.assertEqual(self._tool(["sync"]), "sync")
+        self.assertEqual(self._events, ["tool", "sync"])
+
+    def testConcurrentCall(self):
+        async def main():
+            return await asyncio.gather(
+                *(self._tool.acall(["wait", "0.1"]) for _ in range(10)))
+
+        loop = asyncio.new_event_loop()
+        try:
+            begin = loop.time()
+            results = loop.run_until_complete(main())
+            elapsed = loop.time() - begin
+        finally:
+            loop.close()
+
+        self.assertEqual(results, [0.1] * 10)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(self._events.count("wait"), 10)
+
+    def testSyncCommandAcall(self):
+        @dcli.command("sync", dcli.arg("-v", dest="v", type=int))
+        def sync(ns):
+            return getattr(ns, "v")
+
+        self.assertEqual(asyncio.run(sync.acall(["-v", "3"])), 3)
+
+    def testWrappedHandlers(self):
+        async def scaled(factor, ns):
+            await asyncio.sleep(0)
+            return getattr(ns, "v") * factor
+
+        class Handler:
+            async def __call__(self, ns):
+                await asyncio.sleep(0)
+                return getattr(ns, "v")
+
+        partial = dcli.command("partial", dcli.arg("-v", dest="v", type=int))(functools.partial(scaled, 2))
+        handler = dcli.command("handler", dcli.arg("-v", dest="v", type=int))(Handler())
+        nested = dcli.command("nested", dcli.arg("-v", dest="v", type=int))(functools.partial(Handler()))
+
+        with warnings.catch_warnings():
+            # a handler which is not awaited warns about the coroutine.
+            warnings.simplefilter("error")
+            self.assertEqual(partial(["-v", "3"]), 6)
+            self.assertEqual(handler(["-v", "3"]), 3)
+            self.assertEqual(nested(["-v", "3"]), 3)
+            self.assertEqual(asyncio.run(partial.acall(["-v", "4"])), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import sys
+import io
+import contextlib
+import tempfile
+import pathlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        @dcli.command("tool")
+        def tool(_):
+            pass
+
+        @dcli.command(
+            "add",
+            dcli.arg("values", nargs="+", type=int),
+            parent=tool
+        )
+        def add(ns):
+            return sum(getattr(ns, "values"))
+
+        @dcli.command("fail", parent=tool)
+        def fail(_):
+            raise ValueError("failed")
+
+        @dcli.command("exit", dcli.arg("code", type=int), parent=tool)
+        def exit(ns):
+            sys.exit(getattr(ns, "code"))
+
+        self._tool = tool
+
+    def testRunBatch(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            results = list(self._tool.runBatch([
+                ["add", "1", "2"],
+                ["add", "x"],
+                ["fail"],
+                ["exit", "0"],
+                ["exit", "3"],
+                ["add", "4"],
+            ]))
+
+        self.assertEqual([x.code for x in results], [0, 2, 1, 0, 3, 0])
+        self.assertEqual(results[0].value, 3)
+        self.assertIsInstance(results[1].error, dcli.UsageError)
+        self.assertIn("invalid int value", str(results[1].error))
+        self.assertIsInstance(results[2].error, ValueError)
+        self.assertIsNone(results[3].error)
+        self.assertEqual(results[5].value, 4)
+        # usage errors are not printed in batch mode.
+        self.assertEqual(stderr.getvalue(), "")
+
+    def testUsageErrorOutsideBatch(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertRaises(SystemExit, self._tool, ["add", "x"])
+        self.assertIn("usage:", stderr.getvalue())
+
+    def testBatchFile(self):
+        with tempfile.TemporaryDirectory() as dir:
+            path = pathlib.Path(dir, "batch.txt")
+            path.write_text("# comment\nadd 1 2\n\nadd 3\n")
+            self.assertIsNone(self._tool(["--dcli-batch", str(path)]))
+
+            path.write_text("add 1\nfail\nadd 'x y'\n")
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                self.assertRaises(SystemExit, self._tool,
+                                  ["--dcli-batch", str(path)])
+            lines = stderr.getvalue().splitlines()
+            self.assertEqual(len(lines), 2)
+            self.assertTrue(lines[0].startswith("tool: line 2: exit 1:"))
+            self.assertTrue(lines[1].startswith("tool: line 3: exit 2:"))
+
+            # a line which can not be split fails alone.
+            path.write_text("add 1\nadd --n 'oops\nfail\n")
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                self.assertRaises(SystemExit, self._tool,
+                                  ["--dcli-batch", str(path)])
+            lines = stderr.getvalue().splitlines()
+            self.assertEqual(lines[0], "tool: line 2: exit 2: No closing quotation")
+            self.assertTrue(lines[1].startswith("tool: line 3: exit 1:"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+import tempfile
+import pathlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+_MODULE_SOURCE = """
+from src import dcli
+
+@dcli.command(
+    "tool",
+    dcli.arg("--root", dest="root", type=int, default=0),
+    skippable=False
+)
+def Tool(ns):
+    pass
+
+@dcli.command(
+    "sub",
+    dcli.arg("names", nargs="*"),
+    parent=Tool,
+    help="I am sub command."
+)
+def Sub(ns):
+    return (getattr(ns, "root"), getattr(ns, "names"))
+"""
+
+
+class TestCachedCommand(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._module = f"cached_{id(self)}"
+        self._source = pathlib.Path(self._dir.name, f"{self._module}.py")
+        self._source.write_text(_MODULE_SOURCE)
+        self._cache = pathlib.Path(self._dir.name, "tree.cache")
+        sys.path.insert(0, self._dir.name)
+
+    def tearDown(self):
+        sys.path.remove(self._dir.name)
+        sys.modules.pop(self._module, None)
+        self._dir.cleanup()
+
+    def testLoadWithoutImport(self):
+        target = f"{self._module}:Tool"
+        tool = dcli.cachedCommand(target, self._cache)
+        self.assertTrue(self._cache.exists())
+        self.assertEqual(tool(["--root", "1", "sub", "a"]), (1, ["a"]))
+
+        sys.modules.pop(self._module)
+        tool = dcli.cachedCommand(target, self._cache)
+        self.assertNotIn(self._module, sys.modules)
+        self.assertEqual(tool._subcommands["sub"]._brief_help,
+                         "I am sub command.")
+        self.assertEqual(tool(["sub", "b", "c"]), (0, ["b", "c"]))
+        self.assertIn(self._module, sys.modules)
+
+    def testRebuildOnSourceChange(self):
+        target = f"{self._module}:Tool"
+        dcli.cachedCommand(target, self._cache)
+        sys.modules.pop(self._module)
+
+        self._source.write_text(_MODULE_SOURCE + "\n# changed\n")
+        stat = self._source.stat()
+        os.utime(self._source, ns=(stat.st_atime_ns,
+                                   stat.st_mtime_ns + 1_000_000_000))
+        dcli.cachedCommand(target, self._cache)
+        self.assertIn(self._module, sys.modules)
+
+    def testUnreadableCache(self):
+        self._cache.write_bytes(b"not a cache")
+        tool = dcli.cachedCommand(f"{self._module}:Tool", self._cache)
+        self.assertEqual(tool(["sub"]), (0, []))
+
+
+    def testRenderHelp(self):
+        target = f"{self._module}:Tool"
+        dcli.cachedCommand(target, self._cache, render_help=True)
+
+        sys.modules.pop(self._module)
+        tool = dcli.cachedCommand(target, self._cache)
+        self.assertEqual(len(tool._help_cache), 2)
+        self.assertEqual(len(tool._subcommands["sub"]._help_cache), 2)
+        self.assertIn("I am sub command.", tool._getParser().format_help())
+        self.assertEqual(len(tool._help_cache), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import unittest
+import sys
+import io
+import random
+import tempfile
+import pathlib
+import contextlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+from src.dcli import codegen
+
+
+_MODULE_SOURCE = """
+from src import dcli
+
+@dcli.command(
+    "tool",
+    dcli.arg("--verbose", "-v", action="count"),
+    dcli.arg("--level", choices=["low", "high"], default="low"),
+    lazy=True
+)
+def Tool(ns):
+    pass
+
+@dcli.command(
+    "add",
+    dcli.arg("x", type=int),
+    dcli.arg("--ys", nargs="+", type=float, default=[]),
+    dcli.arg("--tag", action="append"),
+    dcli.arg("--dry", action="store_true"),
+    parent=Tool
+)
+def Add(ns):
+    return (dcli.invocation().path, ns.x + sum(ns.ys))
+
+@dcli.command(
+    "deep",
+    dcli.arg("--n", type=int, default="3"),
+    parent=Tool,
+    need_sub=False
+)
+def Deep(ns):
+    return ns.n
+
+@dcli.command(
+    "leaf",
+    dcli.arg("name", choices=["a", "b"]),
+    dcli.arg("--opt", nargs="?", const="c"),
+    parent=Deep
+)
+def Leaf(ns):
+    return (ns.name, ns.n, ns.opt)
+
+@dcli.command("ids", dcli.arg("ids", array="q"), parent=Tool)
+def Ids(ns):
+    return list(ns.ids)
+
+Tool.addDeferredSubCommand("plug", __name__ + "_plug:run")
+Tool.addDeferredSubCommand("plugs", __name__ + "_plug:Plugs")
+"""
+
+_PLUG_SOURCE = """
+from src import dcli
+
+def run(ns):
+    return "plug"
+
+@dcli.command("plugs")
+def Plugs(ns):
+    pass
+
+@dcli.command("sub", dcli.arg("--v", type=int), parent=Plugs)
+def Sub(ns):
+    return ("sub", ns.v)
+"""
+
+
+class TestCodegen(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._module = f"codegen_{id(self)}"
+        pathlib.Path(self._dir.name, f"{self._module}.py").write_text(_MODULE_SOURCE)
+        pathlib.Path(self._dir.name, f"{self._module}_plug.py").write_text(_PLUG_SOURCE)
+        sys.path.insert(0, self._dir.name)
+
+        self._target = f"{self._module}:Tool"
+        self._path = pathlib.Path(self._dir.name, "dispatch.py")
+        codegen.writeModule(self._target, self._path)
+        self.dispatch = codegen.loadModule(self._path)
+        self.tool = sys.modules[self._module].Tool
+
+    def tearDown(self):
+        sys.path.remove(self._dir.name)
+        sys.modules.pop(self._module, None)
+        sys.modules.pop(f"{self._module}_plug", None)
+        self._dir.cleanup()
+
+    def testStandalone(self):
+        source = self._path.read_text()
+        self.assertNotIn("import argparse", source)
+        self.assertNotIn("import dcli", source)
+
+    def testParse(self):
+        self.assertEqual(self.dispatch.parse(["-v", "add", "1", "--ys", "2", "3", "--tag", "t", "--tag=u"]),
+                         ({"verbose": 1, "level": "low", "x": 1, "ys": [2.0, 3.0], "tag": ["t", "u"], "dry": False},
+                          ["add"]))
+        self.assertEqual(self.dispatch.parse(["deep"]), ({"verbose": None, "level": "low", "n": 3}, ["deep"]))
+        self.assertEqual(self.dispatch.parse(["deep", "leaf", "a", "--opt"]),
+                         ({"verbose": None, "level": "low", "n": 3, "name": "a", "opt": "c"}, ["deep", "leaf"]))
+
+    def testFallback(self):
+        for argv in [[], ["-h"], ["add"], ["add", "x"], ["--lev", "high", "add", "1"], ["add", "1", "--", "2"],
+                     ["--level", "mid", "add", "1"], ["deep", "leaf", "c"], ["ids", "1", "2"], ["-vv", "deep"]]:
+            self.assertEqual(self.dispatch.parse(argv), None, argv)
+
+    def testMain(self):
+        self.assertEqual(self.dispatch.main(["add", "1", "--ys", "2"]), (("tool", "add"), 3.0))
+        self.assertEqual(self.dispatch.main(["deep", "leaf", "b"]), ("b", 3, None))
+        # left to the command tree.
+        self.assertEqual(self.dispatch.main(["ids", "1", "2"]), [1, 2])
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            with self.assertRaises(SystemExit):
+                self.dispatch.main(["add", "x"])
+        self.assertIn("invalid int value: 'x'", stderr.getvalue())
+
+    def testLazyImport(self):
+        # the target is an entry module re-exporting the command tree, imported only on fallback.
+        entry = f"{self._module}_entry"
+        pathlib.Path(self._dir.name, f"{entry}.py").write_text(f"from {self._module} import Tool\n")
+        codegen.writeModule(f"{entry}:Tool", self._path)
+        dispatch = codegen.loadModule(self._path)
+        sys.modules.pop(entry, None)
+        try:
+            self.assertEqual(dispatch.main(["add", "1", "--ys", "2"]), (("tool", "add"), 3.0))
+            self.assertEqual(dispatch.main(["deep", "leaf", "b"]), ("b", 3, None))
+            self.assertNotIn(entry, sys.modules)
+
+            self.assertEqual(dispatch.main(["ids", "1", "2"]), [1, 2])
+            self.assertIn(entry, sys.modules)
+        finally:
+            sys.modules.pop(entry, None)
+
+    def testDeferred(self):
+        # the dispatcher runs in a fresh process, where deferred sub-commands are not resolved yet.
+        sys.modules.pop(self._module)
+        sys.modules.pop(f"{self._module}_plug")
+        self.assertEqual(self.dispatch.parse(["plugs", "sub", "--v", "1"]), ({"verbose": None, "level": "low", "v": 1}, ["plugs", "sub"]))
+        self.assertEqual(self.dispatch.main(["plug"]), "plug")
+        self.assertEqual(self.dispatch.main(["plugs", "sub", "--v", "1"]), ("sub", 1))
+
+    def testMounted(self):
+        @dcli.command("other")
+        def other(ns):
+            pass
+
+        other.mountSubCommand(self.tool._subcommands["deep"])
+        nodes = []
+        codegen._node(other, nodes, ("other",))
+        # the mounted command runs with the parents of its own tree, so it is left to the target.
+        self.assertEqual([x[7] for x in nodes], [None, None, None])
+
+    def testVerify(self):
+        report = codegen.verify(self.tool, self.dispatch, codegen.sampleCorpus(self.tool))
+        self.assertEqual(report["mismatches"], [])
+        self.assertGreater(report["matched"], 10)
+
+        # random command lines, mostly invalid ones.
+        words = ["add", "deep", "leaf", "ids", "a", "c", "1", "2.5", "x", "-1", "--", "-", "-v", "--verbose",
+                 "--level", "high", "--level=low", "--lev", "--ys", "--tag", "--tag=", "--dry", "--dry=1", "--n",
+                 "--n=4", "--opt", "--opt=z", "-h"]
+        rng = random.Random(0)
+        corpus = [[rng.choice(words) for _ in range(rng.randint(0, 6))] for _ in range(2000)]
+        corpus += [["-v", "deep", *rng.sample(words, 3)] for _ in range(500)]
+        corpus += [["add", "1", *rng.sample(words, 3)] for _ in range(500)]
+        report = codegen.verify(self.tool, self.dispatch, corpus)
+        self.assertEqual(report["mismatches"], [])
+        self.assertEqual(report["checked"], 3000)
+
+    def testMainVerify(self):
+        corpus = pathlib.Path(self._dir.name, "corpus.txt")
+        corpus.write_text("# command lines\nadd 1 --dry\ndeep --n 2 leaf a\n\n")
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            self.assertEqual(codegen.main(["verify", self._target, str(self._path), str(corpus)]), 0)
+        self.assertEqual(stdout.getvalue(), "2 checked, 2 matched, 0 left to argparse, 0 mismatched\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import sys
+import json
+import shutil
+import subprocess
+import tempfile
+import pathlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+from src.dcli import completion
+
+
+class TestCompletion(unittest.TestCase):
+
+    def setUp(self):
+        @dcli.command(
+            "tool",
+            dcli.arg("--verbose", action="store_true"),
+            dcli.arg("--level", choices=["low", "high"])
+        )
+        def tool(_):
+            pass
+
+        @dcli.command(
+            "sub1",
+            dcli.arg("mode", choices=["fast", "slow"]),
+            dcli.arg("--output", dest="output"),
+            parent=tool
+        )
+        def sub1(_):
+            pass
+
+        @dcli.command("sub2", parent=tool)
+        def sub2(_):
+            pass
+
+        self._index = completion.buildIndex(tool)
+
+    def testSubCommands(self):
+        self.assertEqual(completion.complete(self._index, [""]),
+                         ["sub1", "sub2"])
+        self.assertEqual(completion.complete(self._index, ["--verbose", "s"]),
+                         ["sub1", "sub2"])
+
+    def testOptions(self):
+        self.assertEqual(completion.complete(self._index, ["--"]),
+                         ["--help", "--level", "--verbose"])
+        self.assertEqual(completion.complete(self._index, ["sub1", "--o"]),
+                         ["--output"])
+
+    def testChoices(self):
+        self.assertEqual(completion.complete(self._index, ["--level", ""]),
+                         ["high", "low"])
+        self.assertEqual(completion.complete(self._index, ["sub1", "f"]),
+                         ["fast"])
+        self.assertEqual(
+            completion.complete(self._index, ["sub1", "--output", "x", ""]),
+            ["fast", "slow"])
+
+    def testPositionals(self):
+        @dcli.command(
+            "tool",
+            dcli.arg("name"),
+            dcli.arg("pair", nargs=2, choices=["a", "b"]),
+            dcli.arg("mode", choices=["fast", "slow"]),
+            dcli.arg("rest", nargs="*", choices=["x", "y"])
+        )
+        def tool(_):
+            pass
+
+        index = completion.buildIndex(tool)
+        # positionals without choices still take their words.
+        self.assertEqual(completion.complete(index, [""]), [])
+        self.assertEqual(completion.complete(index, ["n", ""]), ["a", "b"])
+        self.assertEqual(completion.complete(index, ["n", "a", ""]), ["a", "b"])
+        self.assertEqual(completion.complete(index, ["n", "a", "b", ""]), ["fast", "slow"])
+        self.assertEqual(completion.complete(index, ["n", "a", "b", "fast", "x", ""]), ["x", "y"])
+
+    def testIndexFile(self):
+        with tempfile.TemporaryDirectory() as dir:
+            path = pathlib.Path(dir, "index.json")
+            completion.writeIndex(dcli.command("root")(lambda _: None), path)
+            self.assertEqual(json.loads(path.read_text())["sub"], {})
+
+    def testScript(self):
+        self.assertIn("complete -o default -F _dcli_complete_my_tool my-tool",
+                      completion.script("bash", "my-tool", "index.json"))
+        self.assertRaises(AssertionError, completion.script,
+                          "cmd", "my-tool", "index.json")
+
+    @unittest.skipIf(shutil.which("bash") == None, "bash is not available.")
+    def testScriptQuoting(self):
+        with tempfile.TemporaryDirectory() as dir:
+            path = pathlib.Path(dir, "my dir", "it's.json")
+            path.parent.mkdir()
+            path.write_text(json.dumps(self._index))
+            source = completion.script("bash", "my-tool", str(path))
+            # the completion function of bash, run as on <Tab> after "my-tool sub1 f".
+            check = "COMP_WORDS=(my-tool sub1 f); COMP_CWORD=2; _dcli_complete_my_tool; echo \"${COMPREPLY[@]}\""
+            output = subprocess.run(["bash", "-c", f"{source}\n{check}"], check=True,
+                                    capture_output=True, text=True).stdout
+        self.assertEqual(output, "fast\n")
+
+        self.assertIn("""complete '/a b/it'"'"'s.json'""", completion.script("zsh", "my-tool", "/a b/it's.json"))
+        self.assertIn("""complete \\'/a b/it\\\\\\'s.json\\'""",
+                      completion.script("fish", "my-tool", "/a b/it's.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
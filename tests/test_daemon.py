@@ -0,0 +1,124 @@
+import unittest
+import sys
+import io
+import os
+import tempfile
+import socket
+import threading
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+from src.dcli import daemon
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        @dcli.command("tool")
+        def tool(_):
+            pass
+
+        @dcli.command(
+            "echo",
+            dcli.arg("words", nargs="*"),
+            parent=tool
+        )
+        def echo(ns):
+            print(*getattr(ns, "words"))
+
+        @dcli.command("upper", parent=tool)
+        def upper(_):
+            sys.stdout.write(sys.stdin.read().upper())
+
+        @dcli.command(
+            "exit",
+            dcli.arg("code", type=int),
+            parent=tool
+        )
+        def exit(ns):
+            print("bye", file=sys.stderr)
+            sys.exit(getattr(ns, "code"))
+
+        @dcli.command("env", parent=tool)
+        def env(_):
+            print(os.getcwd(), os.environ.get("DCLI_DAEMON_TEST"))
+
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._dir.name, "tool.sock")
+        self._daemon = daemon.Daemon(tool, self._path)
+        self._thread = threading.Thread(
+            target=self._daemon.serveForever, args=(0.05,))
+        self._thread.start()
+
+    def tearDown(self):
+        self._daemon.close()
+        self._thread.join()
+        self._dir.cleanup()
+
+    def run_client(self, argv, stdin=b""):
+        stdout = io.BytesIO()
+        stderr = io.BytesIO()
+        code = daemon.client(self._path, argv,
+                             stdin=io.BytesIO(stdin),
+                             stdout=stdout,
+                             stderr=stderr)
+        return code, stdout.getvalue().decode(), stderr.getvalue().decode()
+
+    def testOutput(self):
+        self.assertEqual(self.run_client(["echo", "hello", "world"]),
+                         (0, "hello world\n", ""))
+
+    def testStdin(self):
+        self.assertEqual(self.run_client(["upper"], b"abc\ndef\n"),
+                         (0, "ABC\nDEF\n", ""))
+
+    def testExitCode(self):
+        self.assertEqual(self.run_client(["exit", "3"]), (3, "", "bye\n"))
+        code, _, err = self.run_client(["unknown"])
+        self.assertEqual(code, 2)
+        self.assertIn("invalid choice", err)
+
+    def testEnvironment(self):
+        os.environ["DCLI_DAEMON_TEST"] = "yes"
+        try:
+            code, out, _ = self.run_client(["env"])
+        finally:
+            del os.environ["DCLI_DAEMON_TEST"]
+        self.assertEqual(code, 0)
+        self.assertEqual(out, f"{os.getcwd()} yes\n")
+
+    def testCommandLineIsolated(self):
+        @dcli.command("local", dcli.arg("-v", dest="v", default=1))
+        def local(_):
+            pass
+
+        local([])
+        args = dcli.commandLine()
+        self.run_client(["echo", "x"])
+        self.assertIs(dcli.commandLine(), args)
+
+    def testExistingPath(self):
+        # a running daemon is not replaced.
+        with self.assertRaises(FileExistsError):
+            daemon.Daemon(self._daemon._command, self._path)
+        self.assertEqual(self.run_client(["echo", "x"])[0], 0)
+
+        path = os.path.join(self._dir.name, "file")
+        with open(path, "w") as f:
+            f.write("data")
+        with self.assertRaises(FileExistsError):
+            daemon.Daemon(self._daemon._command, path)
+        self.assertTrue(os.path.isfile(path))
+
+        # the socket of a daemon which is gone is replaced.
+        path = os.path.join(self._dir.name, "stale.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        daemon.Daemon(self._daemon._command, path).close()
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import sys
+import io
+import contextlib
+import tempfile
+import pathlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+_MODULE_SOURCE = """
+from src import dcli
+
+@dcli.command(
+    "export",
+    dcli.arg("-n", dest="num", type=int, default=0),
+    need_sub=False,
+    skippable=False
+)
+def Export(ns):
+    return ("export", getattr(ns, "num"))
+
+@dcli.command("csv", parent=Export)
+def ExportCsv(ns):
+    return ("csv", getattr(ns, "num"))
+
+def plain(ns):
+    return "plain"
+"""
+
+
+class TestDeferredCommand(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._module = f"deferred_{id(self)}"
+        pathlib.Path(self._dir.name, f"{self._module}.py").write_text(
+            _MODULE_SOURCE)
+        sys.path.insert(0, self._dir.name)
+
+    def tearDown(self):
+        sys.path.remove(self._dir.name)
+        sys.modules.pop(self._module, None)
+        self._dir.cleanup()
+
+    def testImportOnlyWhenInvoked(self):
+        @dcli.command("root")
+        def rootCmd(_):
+            return "root"
+
+        rootCmd.addDeferredSubCommand("export", f"{self._module}:Export",
+                                      help="Export something.")
+        rootCmd.addDeferredSubCommand("plain", f"{self._module}:plain")
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertRaises(SystemExit, rootCmd, ["-h"])
+        self.assertIn("Export something.", out.getvalue())
+        self.assertNotIn(self._module, sys.modules)
+
+        self.assertEqual(rootCmd(["export", "-n", "3"]), ("export", 3))
+        self.assertIn(self._module, sys.modules)
+        self.assertEqual(rootCmd(["export", "csv"]), ("csv", 0))
+        self.assertEqual(rootCmd(["plain"]), "plain")
+
+    def testInvalidTarget(self):
+        @dcli.command("root")
+        def rootCmd(_):
+            pass
+
+        self.assertRaises(AssertionError, rootCmd.addDeferredSubCommand,
+                          "sub", "no_function_path")
+        rootCmd.addDeferredSubCommand("sub", f"{self._module}:plain")
+        self.assertRaises(AssertionError, rootCmd.addDeferredSubCommand,
+                          "sub", f"{self._module}:plain")
+
+
+if __name__ == "__main__":
+    unittest.main()
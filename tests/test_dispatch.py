@@ -0,0 +1,114 @@
+import unittest
+import sys
+import io
+import contextlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+def _build():
+    @dcli.command(
+        "root",
+        dcli.arg("-v", "--verbose", action="count", default=0),
+        dcli.arg("--level", choices=["low", "high"], default="low")
+    )
+    def root(_):
+        pass
+
+    @dcli.command(
+        "sub",
+        dcli.arg("name"),
+        dcli.arg("-n", "--num", type=int, default="7"),
+        dcli.arg("-t", dest="tags", action="append"),
+        dcli.arg("-f", "--flag", action="store_true"),
+        parent=root,
+        need_sub=False
+    )
+    def sub(_):
+        pass
+
+    @dcli.command(
+        "leaf",
+        dcli.arg("values", nargs="*"),
+        dcli.arg("--required", required=True),
+        parent=sub
+    )
+    def leaf(_):
+        pass
+
+    return root
+
+
+_CORPUS = [
+    ["sub", "x"],
+    ["-v", "-v", "--level", "high", "sub", "x", "-n", "3", "-f"],
+    ["sub", "-n", "3", "x", "-t", "a", "-t", "b"],
+    ["sub", "--num=5", "x", "--flag"],
+    ["--level=high", "sub", "x"],
+    # fall back to argparse
+    ["sub", "x", "--fl"],
+    ["-vv", "sub", "x"],
+    ["sub", "x", "leaf", "--required", "r", "a", "b"],
+    ["sub", "--", "x"],
+    ["sub", "x", "-n", "-1"],
+]
+
+_ERRORS = [
+    [],
+    ["sub"],
+    ["--level", "mid", "sub", "x"],
+    ["sub", "x", "-n", "abc"],
+    ["sub", "x", "--unknown"],
+    ["unknown"],
+    ["sub", "x", "leaf"],
+]
+
+
+class TestDispatch(unittest.TestCase):
+
+    def parse(self, cmd, argv):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            try:
+                cmd(argv)
+            except SystemExit as e:
+                return e.code, stderr.getvalue()
+        args = vars(dcli.commandLine())
+        return args, stderr.getvalue()
+
+    def testSameNamespace(self):
+        compiled = _build().compile()
+        for argv in _CORPUS + _ERRORS:
+            with self.subTest(argv=argv):
+                self.assertEqual(self.parse(compiled, argv),
+                                 self.parse(_build(), argv))
+
+    def testSingleValues(self):
+        compiled = _build().compile()
+        self.parse(compiled, ["-v", "--level", "high", "sub", "x", "-n", "3"])
+        args = dcli.commandLine()
+        self.assertEqual((args.verbose, args.level, args.name, args.num),
+                         (1, "high", "x", 3))
+        # the string default is converted as argparse does.
+        self.parse(compiled, ["sub", "x"])
+        self.assertEqual(dcli.commandLine().num, 7)
+
+    def testFallbackForComplexCommand(self):
+        root = _build().compile()
+        leaf = root._subcommands["sub"]._subcommands["leaf"]
+        self.assertFalse(leaf._dispatchTable().simple)
+        self.assertTrue(root._dispatchTable().simple)
+        self.assertIsNotNone(dcli.dcli._planDispatch(root, _CORPUS[1], 0))
+        self.assertIsNone(dcli.dcli._planDispatch(root, _CORPUS[5], 0))
+
+    def testTableInvalidated(self):
+        root = _build().compile()
+        self.assertNotIn("--extra", root._dispatchTable().options)
+        root._addArgument(dcli.arg("--extra"))
+        self.assertIn("--extra", root._dispatchTable().options)
+
+
+if __name__ == "__main__":
+    unittest.main()
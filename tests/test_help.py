@@ -0,0 +1,97 @@
+import unittest
+import sys
+import os
+import io
+import contextlib
+import argparse
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+def _help(cmd, argv):
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        try:
+            cmd(argv)
+        except SystemExit:
+            pass
+    return stdout.getvalue()
+
+
+class TestHelpCache(unittest.TestCase):
+
+    def setUp(self):
+        self._columns = os.environ.get("COLUMNS")
+        os.environ["COLUMNS"] = "80"
+
+    def tearDown(self):
+        if self._columns == None:
+            os.environ.pop("COLUMNS")
+        else:
+            os.environ["COLUMNS"] = self._columns
+
+    def testCachedHelp(self):
+        @dcli.command("root", dcli.arg("--foo", help="the foo option"))
+        def root(_):
+            pass
+
+        @dcli.command("sub", parent=root, help="I am sub command.")
+        def sub(_):
+            pass
+
+        text = _help(root, ["-h"])
+        self.assertIn("I am sub command.", text)
+        self.assertEqual(len(root._help_cache), 1)
+
+        root._getParser()._help_cache[next(iter(root._help_cache))] = "cached\n"
+        self.assertEqual(_help(root, ["-h"]), "cached\n")
+        self.assertEqual(_help(root, ["sub", "-h"]),
+                         argparse.ArgumentParser.format_help(sub._getParser()))
+
+    def testTerminalWidth(self):
+        @dcli.command("root", dcli.arg("--foo", help="the foo option " * 8))
+        def root(_):
+            pass
+
+        narrow = _help(root, ["-h"])
+        os.environ["COLUMNS"] = "200"
+        wide = _help(root, ["-h"])
+
+        self.assertNotEqual(narrow, wide)
+        self.assertEqual(len(root._help_cache), 2)
+
+    def testInvalidate(self):
+        @dcli.command("root")
+        def root(_):
+            pass
+
+        _help(root, ["-h"])
+        self.assertEqual(len(root._help_cache), 1)
+
+        @dcli.command("sub", parent=root, help="I am sub command.")
+        def sub(_):
+            pass
+
+        self.assertEqual(root._help_cache, {})
+        self.assertIn("I am sub command.", _help(root, ["-h"]))
+
+        root._addArgument(dcli.arg("--bar", help="the bar option"))
+        self.assertIn("the bar option", _help(root, ["-h"]))
+
+    def testUsageError(self):
+        @dcli.command("root", dcli.arg("value", type=int))
+        def root(_):
+            pass
+
+        for _ in range(2):
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+                root(["x"])
+            self.assertTrue(stderr.getvalue().startswith("usage: root [-h] value"))
+        self.assertEqual(len(root._help_cache), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import sys
+import io
+import json
+import contextlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+class TestHooks(unittest.TestCase):
+
+    def testPhases(self):
+        @dcli.command("root", lazy=True, skippable=False)
+        def root(_):
+            pass
+
+        @dcli.command("sub", parent=root, skippable=False)
+        def sub(_):
+            pass
+
+        @dcli.command("leaf", parent=sub)
+        def leaf(_):
+            pass
+
+        events = []
+        hook = dcli.addHook(pre=lambda phase, path: events.append(("pre", phase, path)),
+                            post=lambda phase, path, seconds: events.append(("post", phase, path)))
+        try:
+            root(["sub", "leaf"])
+        finally:
+            dcli.removeHook(hook)
+
+        self.assertIn(("pre", "parse", ("root",)), events)
+        self.assertIn(("post", "build", ("root", "sub", "leaf")), events)
+        self.assertEqual(events[-6:], [("pre", "parent", ("root",)),
+                                       ("post", "parent", ("root",)),
+                                       ("pre", "parent", ("root", "sub")),
+                                       ("post", "parent", ("root", "sub")),
+                                       ("pre", "leaf", ("root", "sub", "leaf")),
+                                       ("post", "leaf", ("root", "sub", "leaf"))])
+
+        events.clear()
+        root(["sub", "leaf"])
+        self.assertEqual(events, [])
+
+    def testAsyncPhases(self):
+        @dcli.command("root")
+        async def root(_):
+            return "done"
+
+        phases = []
+        hook = dcli.addHook(post=lambda phase, path, seconds: phases.append(phase))
+        try:
+            self.assertEqual(root([]), "done")
+        finally:
+            dcli.removeHook(hook)
+
+        self.assertEqual(phases, ["parse", "leaf"])
+
+    def testProfileJson(self):
+        @dcli.command("root", dcli.arg("--value", type=int), profile=True)
+        def root(ns):
+            return ns
+
+        @dcli.command("sub", parent=root)
+        def sub(ns):
+            return ns
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            ns = root(["--dcli-profile", "--value", "1", "sub"])
+
+        self.assertFalse(hasattr(ns, "dcli_profile"))
+        report = json.loads(stderr.getvalue())
+        self.assertEqual(report["path"], ["root", "sub"])
+        self.assertEqual([x["phase"] for x in report["phases"]], ["parse", "leaf"])
+        self.assertIn("run", report["timings"])
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            root(["--value", "1", "sub"])
+        self.assertEqual(stderr.getvalue(), "")
+        self.assertEqual(dcli.invocation().phases, None)
+
+    def testProfilePosition(self):
+        @dcli.command("root", profile=True)
+        def root(ns):
+            pass
+
+        @dcli.command("sub", dcli.arg("rest", nargs="*"), parent=root)
+        def sub(ns):
+            return ns.rest
+
+        # the option is found anywhere before "--", and a bare option is not followed by its mode.
+        for argv in (["--dcli-profile", "sub"], ["sub", "--dcli-profile"], ["sub", "--dcli-profile=json"]):
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                self.assertEqual(root(argv), [])
+            self.assertEqual(json.loads(stderr.getvalue())["path"], ["root", "sub"], argv)
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(root(["--dcli-profile", "sub", "cprofile"]), ["cprofile"])
+            self.assertEqual(root(["sub", "--", "--dcli-profile"]), ["--dcli-profile"])
+        self.assertEqual(dcli.invocation().profile, None)
+
+        for argv in (["--dcli-p", "sub"], ["--dcli-profile=bogus", "sub"]):
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                with self.assertRaises(SystemExit):
+                    root(argv)
+            self.assertIn("--dcli-profile", stderr.getvalue())
+
+    def testProfileCProfile(self):
+        @dcli.command("root", profile=True)
+        def root(_):
+            return "done"
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(root(["--dcli-profile=cprofile"]), "done")
+
+        self.assertIn("function calls", stderr.getvalue())
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            root(["--dcli-profile=json"])
+        self.assertEqual(json.loads(stderr.getvalue())["path"], ["root"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import sys
+import asyncio
+import threading
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+class TestInvocation(unittest.TestCase):
+
+    def testPathAndTimings(self):
+        @dcli.command("root")
+        def root(_):
+            pass
+
+        @dcli.command("sub", parent=root)
+        def sub(_):
+            pass
+
+        @dcli.command("leaf", parent=sub)
+        def leaf(_):
+            return dcli.invocation().path
+
+        self.assertEqual(root(["sub", "leaf"]), ("root", "sub", "leaf"))
+        invocation = dcli.invocation()
+        self.assertIs(invocation.args, dcli.commandLine())
+        self.assertGreaterEqual(invocation.timings["parse"], 0)
+        self.assertGreaterEqual(invocation.timings["run"], 0)
+
+        self.assertEqual(leaf([]), ("root", "sub", "leaf"))
+
+    def testNested(self):
+        @dcli.command("inner", dcli.arg("x"))
+        def inner(ns):
+            return dcli.invocation().path
+
+        @dcli.command("outer", dcli.arg("x"), pipeline="+")
+        def outer(ns):
+            before = dcli.invocation()
+            self.assertEqual(inner(["in"]), ("inner",))
+            self.assertEqual(inner(["in"]), ("inner",))
+            # the caller gets its own state back once the inner command returns.
+            self.assertIs(dcli.invocation(), before)
+            return (vars(dcli.commandLine()), dcli.invocation().path)
+
+        self.assertEqual(outer(["out"]), ({"x": "out"}, ("outer",)))
+        # the last top-level invocation stays readable.
+        self.assertEqual(dcli.commandLine().x, "out")
+        inner(["again"])
+        self.assertEqual(dcli.commandLine().x, "again")
+
+        self.assertEqual(outer(["a", "+", "b"]), ({"x": "b"}, ("outer",)))
+        self.assertEqual(dcli.commandLine().x, "b")
+
+    def testConcurrentThreads(self):
+        barrier = threading.Barrier(8)
+        mismatches = []
+
+        @dcli.command("root", dcli.arg("value", type=int))
+        def root(ns):
+            barrier.wait()
+            if dcli.commandLine() is not ns:
+                mismatches.append(ns)
+            return getattr(dcli.commandLine(), "value")
+
+        results = {}
+
+        def run(value):
+            results[value] = root([str(value)])
+            if getattr(dcli.commandLine(), "value") != value:
+                mismatches.append(value)
+
+        threads = [threading.Thread(target=run, args=(x,)) for x in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(mismatches, [])
+        self.assertEqual(results, {x: x for x in range(8)})
+
+    def testConcurrentTasks(self):
+        @dcli.command("root", dcli.arg("value", type=int))
+        async def root(ns):
+            await asyncio.sleep(0.01)
+            return getattr(dcli.commandLine(), "value")
+
+        async def main():
+            return await asyncio.gather(
+                *(root.acall([str(x)]) for x in range(8)))
+
+        self.assertEqual(asyncio.run(main()), list(range(8)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import sys
+import io
+import contextlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+class TestLazyCommand(unittest.TestCase):
+
+    def testParserBuiltOnDemand(self):
+        @dcli.command("root", lazy=True)
+        def rootCmd(_):
+            pass
+
+        @dcli.command(
+            "sub1",
+            dcli.arg("-t", dest="dest", type=int),
+            parent=rootCmd
+        )
+        def sub1(ns):
+            return getattr(ns, "dest")
+
+        @dcli.command("sub2", parent=rootCmd)
+        def sub2(_):
+            pass
+
+        @dcli.command("leaf", parent=sub2)
+        def leaf(_):
+            return "leaf"
+
+        self.assertIsNone(rootCmd._parser)
+        self.assertIsNone(sub1._parser)
+
+        self.assertEqual(rootCmd(["sub1", "-t", "123"]), 123)
+        self.assertIsNotNone(rootCmd._parser)
+        self.assertIsNotNone(sub1._parser)
+        self.assertIsNone(sub2._parser)
+        self.assertIsNone(leaf._parser)
+
+        self.assertEqual(rootCmd(["sub2", "leaf"]), "leaf")
+        self.assertIsNotNone(leaf._parser)
+
+    def testHelpListsUnbuiltSubCommands(self):
+        @dcli.command("root", lazy=True)
+        def rootCmd(_):
+            pass
+
+        @dcli.command("sub1", parent=rootCmd, help="I am sub command #1.")
+        def sub1(_):
+            pass
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertRaises(SystemExit, rootCmd, ["-h"])
+        self.assertIn("I am sub command #1.", out.getvalue())
+        self.assertIsNone(sub1._parser)
+
+    def testLazyMatchesEager(self):
+        def build(lazy):
+            @dcli.command(
+                "root",
+                dcli.arg("--root", dest="root", type=int),
+                lazy=lazy
+            )
+            def rootCmd(_):
+                pass
+
+            @dcli.command(
+                "sub",
+                dcli.arg("names", nargs="*"),
+                dcli.arg("-f", dest="flag", action="store_true"),
+                parent=rootCmd
+            )
+            def sub(ns):
+                return vars(ns)
+
+            return rootCmd
+
+        for argv in (["sub"], ["--root", "1", "sub", "a", "b", "-f"]):
+            eager = build(False)(argv)
+            lazy = build(True)(argv)
+            self.assertEqual(eager, lazy)
+
+    def testConcurrentBuild(self):
+        import threading
+
+        for _ in range(10):
+            @dcli.command("root", lazy=True)
+            def rootCmd(_):
+                pass
+
+            @dcli.command("mid", *[dcli.arg(f"--opt{i}") for i in range(200)], parent=rootCmd)
+            def mid(_):
+                pass
+
+            for i in range(50):
+                @dcli.command(f"leaf{i}", parent=mid)
+                def leaf(_):
+                    return dcli.invocation().path
+
+            errors = []
+
+            def run(i):
+                try:
+                    self.assertEqual(rootCmd(["mid", f"leaf{i}"]), ("root", "mid", f"leaf{i}"))
+                except BaseException as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
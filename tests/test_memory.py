@@ -0,0 +1,94 @@
+import unittest
+import sys
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+def _build(lazy):
+    @dcli.command("root", dcli.arg("--verbose", action="store_true"), lazy=lazy)
+    def root(_):
+        pass
+
+    for i in range(20):
+        dcli.command(f"sub{i}", dcli.arg("--verbose", action="store_true"),
+                     dcli.arg("names", nargs="*"), parent=root)(lambda ns: ns)
+
+    return root
+
+
+class TestMemory(unittest.TestCase):
+
+    def testSlots(self):
+        root = _build(False)
+        self.assertFalse(hasattr(root, "__dict__"))
+        self.assertFalse(hasattr(root._args[0], "__dict__"))
+
+    def testSharedArgumentSpecs(self):
+        self.assertIs(dcli.arg("--foo", choices=("a", "b"), type=str),
+                      dcli.arg("--foo", choices=("a", "b"), type=str))
+        self.assertIsNot(dcli.arg("--foo", default=1), dcli.arg("--foo", default=True))
+        # mutable values are not shared.
+        self.assertIsNot(dcli.arg("--foo", choices=["a"]), dcli.arg("--foo", choices=["a"]))
+        self.assertIsNot(dcli.arg("--foo", default={1}), dcli.arg("--foo", default={1}))
+
+        root = _build(False)
+        self.assertIs(root._subcommands["sub0"]._args[0], root._args[0])
+        self.assertEqual(root._subcommands["sub0"]._kwargs, {"prog": "sub0"})
+
+    def testMutableDefaults(self):
+        @dcli.command("a", dcli.arg("--tag", action="append", default=[]))
+        def a(ns):
+            ns.tag.append("from-a")
+            return ns.tag
+
+        @dcli.command("b", dcli.arg("--tag", action="append", default=[]))
+        def b(ns):
+            return ns.tag
+
+        self.assertEqual(a([]), ["from-a"])
+        self.assertEqual(b([]), [])
+
+    def testSpecsReleased(self):
+        import gc
+        import weakref
+
+        spec = weakref.ref(dcli.arg("--released", default=1))
+        gc.collect()
+        # specs are kept only as long as a command holds them.
+        self.assertEqual(spec(), None)
+
+    def testMemoryUsage(self):
+        eager = _build(False).memoryUsage()
+        lazy = _build(True)
+        before = lazy.memoryUsage()
+
+        self.assertEqual((eager["nodes"], eager["parsers"]), (21, 21))
+        self.assertEqual((before["nodes"], before["parsers"]), (21, 0))
+        self.assertLess(before["bytes"], eager["bytes"])
+
+        lazy(["sub3", "a"])
+        after = lazy.memoryUsage()
+        self.assertEqual(after["parsers"], 2)
+        self.assertGreater(after["bytes"], before["bytes"])
+
+    def testMountedCountedOnce(self):
+        plugin = _build(False)
+
+        @dcli.command("cli")
+        def cli(_):
+            pass
+
+        @dcli.command("other", parent=cli)
+        def other(_):
+            pass
+
+        usage = cli.memoryUsage()
+        cli.mountSubCommand(plugin)
+        other.mountSubCommand(plugin)
+        self.assertEqual(cli.memoryUsage()["nodes"], usage["nodes"] + 21)
+
+
+if __name__ == "__main__":
+    unittest.main()
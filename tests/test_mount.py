@@ -0,0 +1,103 @@
+import unittest
+import sys
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+def _plugin():
+    @dcli.command("plugin", dcli.arg("--level", type=int, default=0),
+                  help="I am a plugin.", skippable=False)
+    def plugin(_):
+        return "plugin"
+
+    @dcli.command("run", dcli.arg("name"), parent=plugin, need_sub=False)
+    def run(ns):
+        return ("run", ns.level, ns.name)
+
+    @dcli.command("deep", dcli.arg("-n", dest="num", type=int, default=1), parent=run)
+    def deep(ns):
+        return ("deep", ns.num, dcli.invocation().path)
+
+    return plugin
+
+
+class TestMount(unittest.TestCase):
+
+    def testMountUnderSeveralParents(self):
+        plugin = _plugin()
+
+        @dcli.command("cli1")
+        def cli1(_):
+            pass
+
+        @dcli.command("cli2", lazy=True)
+        def cli2(_):
+            pass
+
+        builds = []
+        hook = dcli.addHook(post=lambda phase, path, seconds:
+                            builds.append(path) if phase == "build" else None)
+        try:
+            self.assertIs(cli1.mountSubCommand(plugin), plugin)
+            cli2.mountSubCommand(plugin)
+
+            self.assertEqual(cli1(["plugin", "--level", "2", "run", "x"]), ("run", 2, "x"))
+            self.assertEqual(cli2(["plugin", "run", "y", "deep", "-n", "3"]),
+                             ("deep", 3, ("cli2", "plugin", "run", "deep")))
+            self.assertEqual(cli1(["plugin", "run", "z", "deep"]),
+                             ("deep", 1, ("cli1", "plugin", "run", "deep")))
+        finally:
+            dcli.removeHook(hook)
+
+        # the parsers of the plugin are shared, not rebuilt.
+        self.assertEqual(builds, [("cli2",)])
+        self.assertIs(cli1._subcommands["plugin"], cli2._subcommands["plugin"])
+        self.assertEqual(plugin(["run", "w"]), ("run", 0, "w"))
+
+    def testParentHandlers(self):
+        plugin = _plugin()
+        calls = []
+
+        @dcli.command("cli", skippable=False)
+        def cli(_):
+            calls.append(dcli.invocation().path)
+
+        cli.mountSubCommand(plugin)
+        cli(["plugin", "run", "x"])
+        self.assertEqual(calls, [("cli", "plugin", "run")])
+
+        hook = dcli.addHook(post=lambda phase, path, seconds: calls.append((phase, path)))
+        try:
+            cli(["plugin", "run", "x"])
+        finally:
+            dcli.removeHook(hook)
+        self.assertEqual(calls[-3:], [("parent", ("cli",)),
+                                      ("parent", ("cli", "plugin")),
+                                      ("leaf", ("cli", "plugin", "run"))])
+
+    def testCompiledDispatch(self):
+        @dcli.command("cli")
+        def cli(_):
+            pass
+
+        cli.mountSubCommand(_plugin())
+        cli.compile()
+        self.assertEqual(cli(["plugin", "run", "x", "deep", "-n", "5"]),
+                         ("deep", 5, ("cli", "plugin", "run", "deep")))
+
+    def testAddSubCommandCopiesDescendants(self):
+        @dcli.command("cli")
+        def cli(_):
+            pass
+
+        plugin = _plugin()
+        copy = cli.addSubCommand(plugin)
+        self.assertIsNot(copy, plugin)
+        self.assertEqual(cli(["plugin", "run", "x", "deep"]),
+                         ("deep", 1, ("cli", "plugin", "run", "deep")))
+
+
+if __name__ == "__main__":
+    unittest.main()
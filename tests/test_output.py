@@ -0,0 +1,99 @@
+import unittest
+import sys
+import io
+import json
+import pathlib
+import tempfile
+import subprocess
+import contextlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+def _build():
+    @dcli.command("root", output=True)
+    def root(_):
+        pass
+
+    @dcli.command("rows", dcli.arg("count", type=int), parent=root)
+    def rows(ns):
+        for i in range(ns.count):
+            yield {"id": i, "name": f"n,{i}"}
+
+    @dcli.command("values", parent=root)
+    def values(_):
+        yield 1
+        yield (2, "b")
+
+    @dcli.command("plain", parent=root)
+    def plain(_):
+        return [1, 2]
+
+    return root
+
+
+def _run(cmd, argv):
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        result = cmd(argv)
+    return result, stdout.getvalue()
+
+
+class TestOutput(unittest.TestCase):
+
+    def testFormats(self):
+        root = _build()
+        self.assertEqual(_run(root, ["rows", "2"]),
+                         (None, "{'id': 0, 'name': 'n,0'}\n{'id': 1, 'name': 'n,1'}\n"))
+        self.assertEqual(_run(root, ["--output-format", "jsonl", "rows", "2"]),
+                         (None, '{"id": 0, "name": "n,0"}\n{"id": 1, "name": "n,1"}\n'))
+        self.assertEqual(_run(root, ["--output-format", "csv", "rows", "2"]),
+                         (None, 'id,name\n0,"n,0"\n1,"n,1"\n'))
+        self.assertEqual(_run(root, ["--output-format", "csv", "values"]),
+                         (None, "1\n2,b\n"))
+        self.assertEqual(dcli.invocation().output, "csv")
+        self.assertFalse(hasattr(dcli.commandLine(), "dcli_output_format"))
+
+    def testNotGenerator(self):
+        self.assertEqual(_run(_build(), ["plain"]), ([1, 2], ""))
+
+    def testWithoutOption(self):
+        @dcli.command("root")
+        def root(_):
+            yield 1
+
+        result, output = _run(root, [])
+        self.assertEqual((list(result), output), ([1], ""))
+
+    def testLargeOutput(self):
+        _, output = _run(_build(), ["--output-format", "jsonl", "rows", "100000"])
+        lines = output.splitlines()
+        self.assertEqual(len(lines), 100000)
+        self.assertEqual(json.loads(lines[-1]), {"id": 99999, "name": "n,99999"})
+
+    def testBrokenPipe(self):
+        source = ("import sys\n"
+                  f"sys.path.insert(0, {str(test_util.PROJECT_ROOT)!r})\n"
+                  "from src import dcli\n"
+                  "@dcli.command('root', output=True)\n"
+                  "def root(_):\n"
+                  "    yield from range(10 ** 7)\n"
+                  "root(sys.argv[1:])\n")
+        with tempfile.TemporaryDirectory() as dir:
+            script = pathlib.Path(dir, "tool.py")
+            script.write_text(source)
+            producer = subprocess.Popen([sys.executable, str(script)],
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            head = producer.stdout.readline()
+            producer.stdout.close()
+            _, stderr = producer.communicate(timeout=60)
+
+        self.assertEqual(head, b"0\n")
+        self.assertEqual(stderr, b"")
+        self.assertEqual(producer.returncode, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
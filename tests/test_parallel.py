@@ -0,0 +1,111 @@
+import unittest
+import sys
+import time
+import tempfile
+import pathlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+_MODULE_SOURCE = """
+import os
+from src import dcli
+
+@dcli.command("tool")
+def Tool(ns):
+    pass
+
+@dcli.command("square", dcli.arg("value", type=int), parent=Tool)
+def Square(ns):
+    return getattr(ns, "value") ** 2
+
+@dcli.command("pid", parent=Tool)
+def Pid(ns):
+    return os.getpid()
+"""
+
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        @dcli.command("tool")
+        def tool(_):
+            pass
+
+        @dcli.command(
+            "sleep",
+            dcli.arg("seconds", type=float),
+            parent=tool
+        )
+        def sleep(ns):
+            time.sleep(getattr(ns, "seconds"))
+            return getattr(ns, "seconds")
+
+        self._tool = tool
+
+    def testThreadOrdered(self):
+        argvs = [["sleep", str(x)] for x in (0.05, 0.0, 0.03, "x", 0.01)]
+        for chunksize in (1, 2):
+            results = list(self._tool.runParallel(argvs,
+                                                  workers=4,
+                                                  chunksize=chunksize))
+            self.assertEqual([x.argv for x in results], argvs)
+            self.assertEqual([x.code for x in results], [0, 0, 0, 2, 0])
+            self.assertEqual(results[2].value, 0.03)
+
+    def testThreadUnordered(self):
+        argvs = [["sleep", "0.2"], ["sleep", "0"]]
+        results = list(self._tool.runParallel(argvs, workers=2,
+                                              ordered=False))
+        self.assertEqual([x.argv for x in results], argvs[::-1])
+
+    def testTimeout(self):
+        for ordered in (True, False):
+            results = list(self._tool.runParallel([["sleep", "0.5"],
+                                                   ["sleep", "0"]],
+                                                  workers=2,
+                                                  ordered=ordered,
+                                                  timeout=0.1))
+            codes = {x.argv[1]: (x.code, type(x.error)) for x in results}
+            self.assertEqual(codes["0.5"], (1, TimeoutError))
+            self.assertEqual(codes["0"], (0, type(None)))
+
+    def testTimeoutQueued(self):
+        # the clock starts when a worker runs a command line, not while it is queued.
+        for ordered in (True, False):
+            results = list(self._tool.runParallel([["sleep", "0.2"]] * 4,
+                                                  workers=1,
+                                                  ordered=ordered,
+                                                  timeout=0.3))
+            self.assertEqual([x.code for x in results], [0] * 4)
+
+    def testProcess(self):
+        with tempfile.TemporaryDirectory() as dir:
+            module = f"parallel_{id(self)}"
+            pathlib.Path(dir, f"{module}.py").write_text(_MODULE_SOURCE)
+            sys.path.insert(0, dir)
+            try:
+                tool = __import__(module).Tool
+                argvs = [["square", str(x)] for x in range(10)] + [["pid"]] * 8
+                results = list(tool.runParallel(argvs,
+                                                executor="process",
+                                                workers=2,
+                                                chunksize=3))
+            finally:
+                sys.path.remove(dir)
+                sys.modules.pop(module, None)
+
+        self.assertEqual([x.value for x in results[:10]],
+                         [x ** 2 for x in range(10)])
+        self.assertLessEqual(len({x.value for x in results[10:]}), 2)
+
+    def testProcessRequiresImportable(self):
+        self.assertRaises(ValueError, list,
+                          self._tool.runParallel([["sleep", "0"]],
+                                                 executor="process"))
+
+
+if __name__ == "__main__":
+    unittest.main()
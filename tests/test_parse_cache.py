@@ -0,0 +1,98 @@
+import unittest
+import sys
+import io
+import contextlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+class TestParseCache(unittest.TestCase):
+
+    def build(self):
+        @dcli.command("root", dcli.arg("--verbose", action="store_true"))
+        def root(ns):
+            pass
+
+        @dcli.command("add", dcli.arg("values", nargs="+", type=int), parent=root)
+        def add(ns):
+            ns.values.append(0)
+            return sum(ns.values), dcli.invocation().path
+
+        @dcli.command("now", dcli.arg("--at", type=lambda x: object()), parent=root, cacheable=False)
+        def now(ns):
+            return ns.at
+
+        @dcli.command("read", dcli.arg("lines", stream=True), parent=root)
+        def read(ns):
+            return list(ns.lines)
+
+        @dcli.command("pairs", dcli.arg("--pair", nargs=2, action="append"), parent=root)
+        def pairs(ns):
+            for pair in ns.pair:
+                pair.append("x")
+            return ns.pair
+
+        return root.cacheParses(maxsize=2)
+
+    def testHits(self):
+        root = self.build()
+        self.assertEqual(root(["add", "1", "2"]), (3, ("root", "add")))
+        self.assertEqual(root(["add", "1", "2"]), (3, ("root", "add")))
+        self.assertEqual(root(["--verbose", "add", "1", "2"]), (3, ("root", "add")))
+        self.assertTrue(dcli.commandLine().verbose)
+        self.assertEqual(root.parseCacheInfo(), {"hits": 1, "misses": 2, "maxsize": 2, "size": 2})
+
+    def testCopies(self):
+        root = self.build()
+        # the handler appends to its list, which must not change the cached one.
+        for _ in range(3):
+            self.assertEqual(root(["add", "1", "2"]), (3, ("root", "add")))
+            self.assertEqual(dcli.commandLine().values, [1, 2, 0])
+
+    def testNestedCopies(self):
+        root = self.build()
+        for _ in range(3):
+            self.assertEqual(root(["pairs", "--pair", "a", "b", "--pair", "c", "d"]),
+                             [["a", "b", "x"], ["c", "d", "x"]])
+        self.assertEqual(root.parseCacheInfo()["hits"], 2)
+
+    def testEviction(self):
+        root = self.build()
+        root(["add", "1"])
+        root(["add", "2"])
+        root(["add", "3"])
+        root(["add", "1"])
+        self.assertEqual(root.parseCacheInfo()["hits"], 0)
+        root(["add", "1"])
+        self.assertEqual(root.parseCacheInfo()["hits"], 1)
+        self.assertEqual(root.parseCacheInfo()["size"], 2)
+
+    def testNotCacheable(self):
+        root = self.build()
+        self.assertIsNot(root(["now", "--at", "x"]), root(["now", "--at", "x"]))
+        self.assertEqual(root(["read", "a", "b"]), ["a", "b"])
+        self.assertEqual(root(["read", "a", "b"]), ["a", "b"])
+        self.assertEqual(root.parseCacheInfo()["size"], 0)
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            for _ in range(2):
+                with self.assertRaises(SystemExit):
+                    root(["add", "x"])
+        self.assertEqual(root.parseCacheInfo()["size"], 0)
+
+    def testInvalidation(self):
+        root = self.build()
+        root(["add", "1"])
+        root(["add", "1"])
+        self.assertEqual(root.parseCacheInfo()["size"], 1)
+
+        root._getParser().set_defaults(verbose=True)
+        root(["add", "1"])
+        self.assertTrue(dcli.commandLine().verbose)
+        self.assertEqual(root.parseCacheInfo()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
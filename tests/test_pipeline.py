@@ -0,0 +1,144 @@
+import unittest
+import sys
+import io
+import contextlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+from src.dcli import dcli as _dcli
+
+
+class TestPipeline(unittest.TestCase):
+
+    def build(self, events):
+        @dcli.command("tool", pipeline="+", output=True)
+        def tool(ns):
+            pass
+
+        @dcli.command("extract", dcli.arg("n", type=int), parent=tool)
+        def extract(ns):
+            events.append(("extract", ns.n))
+            for i in range(ns.n):
+                events.append(("yield", i))
+                yield i
+
+        @dcli.command("scale", dcli.arg("--by", type=int, default=2), parent=tool)
+        def scale(ns):
+            for x in dcli.invocation().input:
+                yield x * ns.by
+
+        @dcli.command("total", parent=tool)
+        def total(ns):
+            return sum(dcli.invocation().input)
+
+        @dcli.command("first", parent=tool)
+        def first(ns):
+            return next(iter(dcli.invocation().input))
+
+        @dcli.command("fail", parent=tool)
+        def fail(ns):
+            raise ValueError("stage failed")
+
+        return tool
+
+    def testStages(self):
+        events = []
+        tool = self.build(events)
+        self.assertEqual(tool(["extract", "4", "+", "scale", "--by", "3", "+", "total"]), 18)
+        self.assertEqual(tool(["extract", "4", "+", "total"]), 6)
+        self.assertEqual(dcli.invocation().path, ("tool", "total"))
+
+    def testOutput(self):
+        tool = self.build([])
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            tool(["--output-format", "jsonl", "extract", "3", "+", "scale"])
+        self.assertEqual(stdout.getvalue(), "0\n2\n4\n")
+
+    def testLazy(self):
+        events = []
+        tool = self.build(events)
+        self.assertEqual(tool(["extract", "1000000", "+", "scale", "+", "first"]), 0)
+        # the first stage stops once the last one is done, with at most a buffer of items in each pipe.
+        self.assertLess(len(events), 4 * _dcli._PIPELINE_BUFFER)
+
+    def testOverlap(self):
+        import threading
+        received = threading.Event()
+
+        @dcli.command("tool", pipeline="+")
+        def tool(ns):
+            pass
+
+        @dcli.command("produce", parent=tool)
+        def produce(ns):
+            yield 1
+            # the next stage gets the first item while this one is still running.
+            self.assertTrue(received.wait(5))
+            yield 2
+
+        @dcli.command("consume", parent=tool)
+        def consume(ns):
+            result = []
+            for x in dcli.invocation().input:
+                result.append(x)
+                received.set()
+            return result
+
+        self.assertEqual(tool(["produce", "+", "consume"]), [1, 2])
+
+    def testLatency(self):
+        import time
+
+        @dcli.command("tool", pipeline="+")
+        def tool(ns):
+            pass
+
+        @dcli.command("produce", parent=tool)
+        def produce(ns):
+            yield 1
+            yield 2
+            for i in range(3, 5):
+                time.sleep(0.2)
+                yield i
+
+        @dcli.command("consume", parent=tool)
+        def consume(ns):
+            begin = time.perf_counter()
+            return [(x, time.perf_counter() - begin) for x in dcli.invocation().input]
+
+        # an item is passed at once to a waiting stage, even if it does not start a chunk.
+        received = tool(["produce", "+", "consume"])
+        self.assertEqual([x for x, _ in received], [1, 2, 3, 4])
+        self.assertLess(received[1][1], 0.1)
+
+    def testError(self):
+        tool = self.build([])
+        with self.assertRaises(ValueError):
+            tool(["extract", "3", "+", "fail", "+", "total"])
+        with self.assertRaises(ValueError):
+            tool(["fail", "+", "scale", "+", "total"])
+
+    def testInvalidStage(self):
+        events = []
+        tool = self.build(events)
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                tool(["extract", "3", "+", "bogus"])
+        self.assertEqual(events, [])
+
+    def testWithoutPipeline(self):
+        @dcli.command("tool")
+        def tool(ns):
+            return ns.rest
+
+        @dcli.command("echo", dcli.arg("rest", nargs="*"), parent=tool)
+        def echo(ns):
+            return ns.rest
+
+        self.assertEqual(tool(["echo", "a", "+", "b"]), ["a", "+", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import sys
+import time
+import asyncio
+import threading
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+class TestResource(unittest.TestCase):
+
+    def build(self, scope):
+        events = []
+
+        @dcli.command("root", dcli.arg("--url", default="db://a"),
+                      scope=scope, teardown=lambda x: events.append(("close", x)),
+                      skippable=False)
+        def root(ns):
+            events.append(("open", ns.url))
+            return f"conn:{ns.url}"
+
+        @dcli.command("query", dcli.arg("sql"), parent=root)
+        def query(ns):
+            return (dcli.resource(root), ns.sql)
+
+        return root, events
+
+    def testProcessScope(self):
+        root, events = self.build("process")
+        self.assertEqual(root(["query", "a"]), ("conn:db://a", "a"))
+        self.assertEqual(root(["query", "b"]), ("conn:db://a", "b"))
+        self.assertEqual(root(["--url", "db://b", "query", "c"]), ("conn:db://b", "c"))
+        self.assertEqual(events, [("open", "db://a"), ("open", "db://b")])
+        self.assertEqual(dcli.invocation().resources, {root: "conn:db://b"})
+
+        root.releaseResources()
+        self.assertEqual(events[2:], [("close", "conn:db://a"), ("close", "conn:db://b")])
+        root(["query", "d"])
+        self.assertEqual(events[-1], ("open", "db://a"))
+        root.releaseResources()
+
+    def testInvocationScope(self):
+        root, events = self.build("invocation")
+        root(["query", "a"])
+        root(["query", "b"])
+        self.assertEqual(events, [("open", "db://a"), ("close", "conn:db://a"),
+                                  ("open", "db://a"), ("close", "conn:db://a")])
+
+    def testTimeToLive(self):
+        root, events = self.build(0.05)
+        root(["query", "a"])
+        root(["query", "b"])
+        time.sleep(0.1)
+        root(["query", "c"])
+        self.assertEqual(events, [("open", "db://a"), ("close", "conn:db://a"), ("open", "db://a")])
+        root.releaseResources()
+
+    def testExpiredSweep(self):
+        root, events = self.build(0.05)
+        root(["--url", "db://a", "query", "a"])
+        root(["--url", "db://b", "query", "b"])
+        time.sleep(0.1)
+        # expired resources are torn down by a lookup of any arguments, not only of their own.
+        root(["--url", "db://c", "query", "c"])
+        self.assertEqual(events, [("open", "db://a"), ("open", "db://b"),
+                                  ("close", "conn:db://a"), ("close", "conn:db://b"), ("open", "db://c")])
+        root.releaseResources()
+
+    def testAsync(self):
+        opened = []
+
+        @dcli.command("root", scope="process")
+        async def root(_):
+            opened.append(1)
+            return "session"
+
+        @dcli.command("fetch", parent=root)
+        async def fetch(_):
+            return dcli.resource(root)
+
+        async def main():
+            return [await root.acall(["fetch"]) for _ in range(3)]
+
+        self.assertEqual(asyncio.run(main()), ["session"] * 3)
+        self.assertEqual(opened, [1])
+
+    def testThreads(self):
+        root, events = self.build("process")
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(root(["query", "x"])))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [("conn:db://a", "x")] * 8)
+        opened = [x for x in events if x[0] == "open"]
+        closed = [x for x in events if x[0] == "close"]
+        self.assertEqual(len(opened) - len(closed), 1)
+        root.releaseResources()
+
+    def testNoResource(self):
+        @dcli.command("root")
+        def root(_):
+            return dcli.resource(root)
+
+        with self.assertRaises(LookupError):
+            root([])
+
+
+if __name__ == "__main__":
+    unittest.main()
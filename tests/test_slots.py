@@ -0,0 +1,70 @@
+import unittest
+import sys
+import pickle
+import argparse
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+def _build(slots):
+    @dcli.command("root", dcli.arg("--verbose", action="store_true"),
+                  need_sub=False, slots=slots)
+    def root(ns):
+        return ns
+
+    @dcli.command("sub", dcli.arg("names", nargs="*"),
+                  dcli.arg("-n", dest="num", type=int, default=7), parent=root)
+    def sub(ns):
+        return ns
+
+    return root
+
+
+class TestSlots(unittest.TestCase):
+
+    def testSlottedNamespace(self):
+        root = _build(True)
+        ns = root(["--verbose", "sub", "a", "b"])
+
+        self.assertFalse(hasattr(ns, "__dict__"))
+        self.assertIs(dcli.commandLine(), ns)
+        self.assertEqual((ns.verbose, ns.names, ns.num), (True, ["a", "b"], 7))
+        self.assertIn("num", ns)
+        self.assertEqual(ns, _build(False)(["--verbose", "sub", "a", "b"]))
+        self.assertEqual(repr(ns), "Namespace(verbose=True, names=['a', 'b'], num=7)")
+        with self.assertRaises(AttributeError):
+            ns.unknown = 1
+
+        # the class is generated once per command.
+        self.assertIs(type(root(["sub"])), type(ns))
+        self.assertIsNot(type(root([])), type(ns))
+
+    def testSameAsArgparse(self):
+        for argv in ([], ["sub"], ["--verbose", "sub", "x", "-n", "3"]):
+            with self.subTest(argv=argv):
+                self.assertEqual(dict(_build(True)(argv)._get_kwargs()),
+                                 vars(_build(False)(argv)))
+
+    def testCompiled(self):
+        root = _build(True).compile()
+        ns = root(["sub", "x", "-n", "3"])
+        self.assertFalse(hasattr(ns, "__dict__"))
+        self.assertEqual((ns.verbose, ns.names, ns.num), (False, ["x"], 3))
+
+    def testPickle(self):
+        ns = pickle.loads(pickle.dumps(_build(True)(["sub", "x"])))
+        self.assertIsInstance(ns, argparse.Namespace)
+        self.assertEqual(vars(ns), {"verbose": False, "names": ["x"], "num": 7})
+
+    def testInvalidDest(self):
+        @dcli.command("root", dcli.arg("--foo-bar", dest="foo-bar"), slots=True)
+        def root(ns):
+            return ns
+
+        self.assertIsInstance(root(["--foo-bar", "1"]), argparse.Namespace)
+
+
+if __name__ == "__main__":
+    unittest.main()
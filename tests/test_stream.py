@@ -0,0 +1,84 @@
+import unittest
+import sys
+import io
+import pathlib
+import tempfile
+import contextlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+
+
+def _build(**kwargs):
+    @dcli.command("root", dcli.arg("keys", type=int, stream=True, **kwargs),
+                  dcli.arg("--names", stream=True, **kwargs))
+    def root(ns):
+        return ns
+
+    return root
+
+
+class TestStream(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._file = pathlib.Path(self._dir.name, "keys.txt")
+        self._file.write_text("".join(f"{x}\n" for x in range(100000)) + "\n7\n")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def testFile(self):
+        for mmap in (False, True):
+            with self.subTest(mmap=mmap):
+                ns = _build(mmap=mmap)(["1", f"@{self._file}", "2"])
+                self.assertNotIsInstance(ns.keys, list)
+                keys = list(ns.keys)
+                self.assertEqual(len(keys), 100003)
+                self.assertEqual(keys[:3], [1, 0, 1])
+                self.assertEqual(keys[-3:], [99999, 7, 2])
+                self.assertEqual(ns.names, None)
+
+    def testLazy(self):
+        ns = _build()([f"@{self._file}"])
+        self._file.write_text("5\n6\n")
+        self.assertEqual(list(ns.keys), [5, 6])
+
+    def testStdin(self):
+        stdin = sys.stdin
+        sys.stdin = io.StringIO("a\nb\n")
+        try:
+            ns = _build()(["--names", "-", "x"])
+            self.assertEqual(list(ns.names), ["a", "b", "x"])
+            self.assertEqual(list(ns.keys), [])
+        finally:
+            sys.stdin = stdin
+
+    def testInvalidValue(self):
+        self._file.write_text("1\n2\nthree\n")
+        for mmap in (False, True):
+            with self.subTest(mmap=mmap):
+                ns = _build(mmap=mmap)([f"@{self._file}"])
+                stderr = io.StringIO()
+                with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+                    list(ns.keys)
+                self.assertIn(f"invalid int value: 'three' ({self._file}:3)", stderr.getvalue())
+
+    def testSingleValue(self):
+        @dcli.command("root", dcli.arg("--source", type=int, stream=True, nargs=None))
+        def root(ns):
+            return list(ns.source)
+
+        self.assertEqual(root(["--source", f"@{self._file}"])[-1], 7)
+        self.assertEqual(root(["--source", "12"]), [12])
+
+    def testMissingFile(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+            _build()(["@missing.txt"])
+        self.assertIn("can't open 'missing.txt'", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
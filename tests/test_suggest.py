@@ -0,0 +1,85 @@
+import unittest
+import sys
+import io
+import contextlib
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+from src.dcli.dcli import _NameIndex, _editDistance
+
+
+class TestSuggest(unittest.TestCase):
+
+    def error(self, cmd, argv) -> str:
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            with self.assertRaises(SystemExit):
+                cmd(argv)
+        return stderr.getvalue()
+
+    def testEditDistance(self):
+        self.assertEqual(_editDistance("deploy", "deploy"), 0)
+        self.assertEqual(_editDistance("depoly", "deploy"), 1)
+        self.assertEqual(_editDistance("deplo", "deploy"), 1)
+        self.assertEqual(_editDistance("dxplo", "deploy"), 2)
+        self.assertEqual(_editDistance("", "abc"), 3)
+
+    def testNameIndex(self):
+        index = _NameIndex(["status", "start", "stop", "deploy", "destroy"])
+        self.assertEqual(index.prefixed("st"), ["status", "start", "stop"])
+        self.assertEqual(index.prefixed("sta"), ["status", "start"])
+        self.assertEqual(index.prefixed("x"), [])
+        self.assertEqual(index.suggest("stpo"), ["stop"])
+        self.assertEqual(index.suggest("depoly"), ["deploy"])
+        self.assertEqual(index.suggest("des"), ["destroy"])
+        self.assertEqual(index.suggest("xyz"), [])
+
+    def testAbbreviation(self):
+        @dcli.command("root", dcli.arg("--verbose", action="store_true"),
+                      dcli.arg("--version", action="store_true"),
+                      dcli.arg("--output"))
+        def root(ns):
+            return ns
+
+        self.assertTrue(root(["--verb"]).verbose)
+        self.assertEqual(root(["--out", "a"]).output, "a")
+        self.assertEqual(root(["--out=b"]).output, "b")
+        self.assertIn("ambiguous option", self.error(root, ["--ver"]))
+
+        # the index is rebuilt once an option is added.
+        root._getParser().add_argument("--verbosity")
+        self.assertIn("ambiguous option", self.error(root, ["--verb"]))
+        self.assertTrue(root(["--verbose"]).verbose)
+
+    def testSuggestSubCommand(self):
+        @dcli.command("root")
+        def root(ns):
+            pass
+
+        for name in ["deploy", "destroy", "status"]:
+            @dcli.command(name, parent=root)
+            def sub(ns):
+                return ns.__sub_cmd_wrapper__
+
+        self.assertIn("did you mean 'deploy'?", self.error(root, ["depoly"]))
+        self.assertIn("did you mean 'status'?", self.error(root, ["stat"]))
+        self.assertIn("choose from 'deploy', 'destroy', 'status'", self.error(root, ["xyz"]))
+
+    def testWideSubCommands(self):
+        @dcli.command("root")
+        def root(ns):
+            pass
+
+        for i in range(100):
+            @dcli.command(f"command-{i}", parent=root, lazy=True)
+            def sub(ns):
+                pass
+
+        message = self.error(root, ["comand-42"]).splitlines()[-1]
+        self.assertTrue(message.startswith("root: error: invalid choice: 'comand-42' (did you mean 'command-42'"))
+        self.assertIn("see -h for the 100 choices", self.error(root, ["xyz"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import sys
+import threading
+import test_util
+
+sys.path.append(str(test_util.PROJECT_ROOT))
+from src import dcli
+from src.dcli.testing import invoke, invokeMany
+
+
+class TestTesting(unittest.TestCase):
+
+    def setUp(self):
+        @dcli.command("tool", pipeline="+")
+        def tool(_):
+            pass
+
+        @dcli.command("greet", dcli.arg("--name", default="world"), parent=tool)
+        def greet(ns):
+            print(f"hello {ns.name}")
+            return ns.name
+
+        @dcli.command("upper", parent=tool)
+        def upper(_):
+            sys.stdout.write(sys.stdin.read().upper())
+
+        @dcli.command("exit", dcli.arg("code", type=int), parent=tool)
+        def exit(ns):
+            print("bye", file=sys.stderr)
+            sys.exit(ns.code)
+
+        @dcli.command("fail", parent=tool)
+        def fail(_):
+            raise ValueError("failed")
+
+        @dcli.command("count", dcli.arg("n", type=int), parent=tool)
+        def count(ns):
+            for i in range(ns.n):
+                print(i)
+                yield i
+
+        @dcli.command("total", parent=tool)
+        def total(_):
+            return sum(dcli.invocation().input)
+
+        self.tool = tool
+
+    def testOutput(self):
+        result = invoke(self.tool, ["greet", "--name", "foo"])
+        self.assertEqual(result.code, 0)
+        self.assertEqual(result.stdout, "hello foo\n")
+        self.assertEqual(result.stderr, "")
+        self.assertEqual(result.value, "foo")
+        self.assertEqual(result.args.name, "foo")
+        self.assertEqual(result.path, ("tool", "greet"))
+        self.assertEqual(result.error, None)
+
+    def testStdin(self):
+        self.assertEqual(invoke(self.tool, ["upper"], stdin="abc\n").stdout, "ABC\n")
+        self.assertEqual(invoke(self.tool, ["upper"]).stdout, "")
+
+    def testExit(self):
+        result = invoke(self.tool, ["exit", "3"])
+        self.assertEqual((result.code, result.stderr), (3, "bye\n"))
+        self.assertIsInstance(result.error, SystemExit)
+        self.assertEqual(invoke(self.tool, ["exit", "0"]).error, None)
+
+        result = invoke(self.tool, ["fail"])
+        self.assertEqual(result.code, 1)
+        self.assertIsInstance(result.error, ValueError)
+
+    def testUsage(self):
+        result = invoke(self.tool, ["-h"])
+        self.assertEqual(result.code, 0)
+        self.assertIn("usage: tool", result.stdout)
+
+        result = invoke(self.tool, ["bogus"])
+        self.assertEqual(result.code, 2)
+        self.assertIn("invalid choice: 'bogus'", result.stderr)
+        self.assertEqual(result.args, None)
+
+    def testIsolation(self):
+        invoke(self.tool, ["greet"])
+        # the invocation of the test runner does not leak into the caller.
+        self.assertEqual(dcli.commandLine(), None)
+
+    def testPipeline(self):
+        result = invoke(self.tool, ["count", "3", "+", "total"])
+        self.assertEqual((result.value, result.stdout), (3, "0\n1\n2\n"))
+
+    def testParallel(self):
+        argvs = [["greet", "--name", str(i)] for i in range(200)]
+        results = invokeMany(self.tool, argvs, max_workers=8)
+        self.assertEqual([x.stdout for x in results], [f"hello {i}\n" for i in range(200)])
+        self.assertEqual([x.args.name for x in results], [str(i) for i in range(200)])
+
+        errors = []
+
+        def run(i):
+            result = invoke(self.tool, ["exit", str(i % 3)])
+            if result.code != i % 3 or result.stderr != "bye\n":
+                errors.append(result)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(30)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()